@@ -0,0 +1,39 @@
+"""Маршруты чтения тегов, ингредиентов и рецептов для ASGI.
+
+Подключаются в api/urls.py перед роутером, если ASYNC_READ_VIEWS включён.
+Пути и имена совпадают с маршрутами роутера: GET и HEAD обрабатываются
+асинхронно, остальные методы передаются тем же вьюсетам синхронно.
+"""
+from django.urls import re_path
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+LOOKUP = r'(?P<pk>[^/.]+)'
+
+urlpatterns = []
+for prefix, viewset, list_actions, detail_actions in (
+    ('tags', TagViewSet, {'get': 'list'}, {'get': 'retrieve'}),
+    ('ingredients', IngredientViewSet, {'get': 'list'}, {'get': 'retrieve'}),
+    (
+        'recipes',
+        RecipeViewSet,
+        {'get': 'list', 'post': 'create'},
+        {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'},
+    ),
+):
+    urlpatterns += [
+        re_path(
+            fr'^{prefix}/$',
+            viewset.as_async_view(
+                list_actions, basename=prefix, detail=False
+            ),
+            name=f'{prefix}-list'
+        ),
+        re_path(
+            fr'^{prefix}/{LOOKUP}/$',
+            viewset.as_async_view(
+                detail_actions, basename=prefix, detail=True
+            ),
+            name=f'{prefix}-detail'
+        ),
+    ]
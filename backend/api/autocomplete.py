@@ -0,0 +1,80 @@
+import logging
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from recipes.models import Ingredient
+
+from .cache import INGREDIENTS_VERSION, get_version
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientPrefixIndex:
+    """Отсортированный в памяти процесса список ингредиентов.
+    Поиск по началу названия - бинарный поиск по нижнему регистру.
+    Индекс перестраивается, когда сигналы Ingredient меняют версию
+    каталога в кэше."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.keys = ()
+        self.rows = ()
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            # Индекс живёт до следующей смены версии, поэтому читается
+            # с основной базы, а не с отстающей реплики.
+            rows = sorted(
+                (name.lower(), ingredient_id, name, measurement_unit)
+                for ingredient_id, name, measurement_unit
+                in Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+                    'id', 'name', 'measurement_unit'
+                ).iterator()
+            )
+            self.keys = tuple(row[0] for row in rows)
+            self.rows = tuple(
+                {'id': ingredient_id, 'name': name,
+                 'measurement_unit': measurement_unit}
+                for _, ingredient_id, name, measurement_unit in rows
+            )
+            self.version = version
+
+    def warm_up(self):
+        try:
+            self.refresh()
+        except DatabaseError:
+            logger.warning('Индекс ингредиентов не построен', exc_info=True)
+
+    def lookup(self, prefix, limit):
+        keys, rows = self.keys, self.rows
+        start = bisect_left(keys, prefix)
+        result = []
+        for position in range(start, min(start + limit, len(keys))):
+            if not keys[position].startswith(prefix):
+                break
+            result.append(rows[position])
+        return result
+
+    def search(self, name, limit=None):
+        """Ищет по началу названия; если ничего не нашлось, повторяет поиск
+        с запросом, набранным в неверной раскладке."""
+        self.refresh()
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        prefix = name.lower()
+        result = self.lookup(prefix, limit)
+        if not result:
+            translated = prefix.translate(settings.INCORRECT_LAYOUT)
+            if translated != prefix:
+                result = self.lookup(translated, limit)
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
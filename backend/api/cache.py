@@ -0,0 +1,66 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+INGREDIENTS_VERSION = 'version:ingredients'
+TAGS_VERSION = 'version:tags'
+RECIPES_VERSION = 'version:recipes'
+# Версии данных конкретного пользователя; в шаблон подставляется его id.
+FAVORITES_VERSION = 'version:favorites:{}'
+SHOPPING_CART_VERSION = 'version:shopping_cart:{}'
+FOLLOWS_VERSION = 'version:follows:{}'
+USER_VERSIONS = (FAVORITES_VERSION, SHOPPING_CART_VERSION, FOLLOWS_VERSION)
+
+
+def get_version(key):
+    """Текущая версия набора данных.
+    Если счётчик вытеснен из кэша, он заводится заново от текущего времени,
+    так что новая версия никогда не совпадёт с одной из прежних."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_version_on_commit(key):
+    """Меняет версию после фиксации транзакции, иначе параллельный запрос
+    успеет закэшировать под новой версией ещё старые данные."""
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def get_user_versions(user):
+    """Версии избранного, списка покупок и подписок пользователя."""
+    if not user.is_authenticated:
+        return ()
+    return tuple(get_version(key.format(user.id)) for key in USER_VERSIONS)
+
+
+def count_cache_access(name, hit):
+    """Счётчики попаданий и промахов кэша ответов по имени вьюсета."""
+    key = f'stats:{name}:{"hits" if hit else "misses"}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счётчик вытеснили между add и incr.
+        cache.add(key, 1, timeout=None)
+
+
+def get_cache_stats(names):
+    stats = {}
+    for name in names:
+        hits = cache.get(f'stats:{name}:hits', 0)
+        misses = cache.get(f'stats:{name}:misses', 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
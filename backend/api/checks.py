@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Бэкенды, у которых каждый процесс держит свой кэш.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии кэша ответов, ключи привязки к основной базе, обновление
+    индекса ингредиентов и метрики должны видеть все воркеры."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        f'Кэш {backend} не общий для воркеров: изменения в одном воркере '
+        'не сбросят кэш ответов и ETag в остальных.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION, например '
+             'django.core.cache.backends.redis.RedisCache и '
+             'redis://redis:6379.',
+        id='api.W001',
+    )]
@@ -0,0 +1,105 @@
+"""Списки рецептов без полей DRF.
+
+build_recipes собирает тот же JSON, что RecipeGetSerializer, из кортежей
+values_list: три запроса на страницу (рецепты с авторами, теги,
+ингредиенты) и обычные словари вместо дерева полей сериализатора.
+Совпадение с сериализатором проверяют api.tests.test_fastpath и команда
+check_fast_path; при изменении RecipeGetSerializer или вложенных
+сериализаторов нужно менять и этот модуль.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from recipes.models import Recipe, RecipeIngredient
+
+from .membership import get_membership
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'image_variants', 'text', 'cooking_time',
+    'author__email', 'author__id', 'author__username',
+    'author__first_name', 'author__last_name',
+)
+TAG_FIELDS = ('recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug')
+INGREDIENT_FIELDS = (
+    'recipe_id', 'ingredient__id', 'ingredient__name',
+    'ingredient__measurement_unit', 'amount',
+)
+
+
+def get_tags(recipe_ids):
+    tags = {}
+    for recipe_id, *tag in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list(*TAG_FIELDS):
+        tags.setdefault(recipe_id, []).append(
+            dict(zip(('id', 'name', 'color', 'slug'), tag))
+        )
+    return tags
+
+
+def get_ingredients(recipe_ids):
+    ingredients = {}
+    for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+    ).values_list(*INGREDIENT_FIELDS):
+        ingredients.setdefault(recipe_id, []).append(
+            dict(zip(('id', 'name', 'measurement_unit', 'amount'),
+                     ingredient))
+        )
+    return ingredients
+
+
+def get_image_urls(image, variants, build_url):
+    """Как поля image и image_variants сериализатора."""
+    if not image:
+        return None, None
+    image_url = build_url(Recipe._meta.get_field('image').storage.url(image))
+    urls = {}
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        name = variants.get(variant)
+        urls[variant] = (
+            build_url(default_storage.url(name)) if name else image_url
+        )
+    return image_url, urls
+
+
+def build_recipes(recipe_ids, request):
+    """Данные RecipeGetSerializer(many=True) для рецептов recipe_ids
+    в том же порядке. Рецепты, удалённые после выбора страницы,
+    пропускаются."""
+    rows = {
+        row[0]: row for row in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list(*RECIPE_FIELDS)
+    }
+    tags = get_tags(recipe_ids)
+    ingredients = get_ingredients(recipe_ids)
+    membership = get_membership(request)
+    build_url = request.build_absolute_uri if request else str
+    data = []
+    for recipe_id in recipe_ids:
+        if recipe_id not in rows:
+            continue
+        (recipe_id, name, image, variants, text, cooking_time,
+         email, author_id, username, first_name, last_name) = rows[recipe_id]
+        image_url, image_variants = get_image_urls(image, variants, build_url)
+        data.append({
+            'id': recipe_id,
+            'tags': tags.get(recipe_id, []),
+            'author': {
+                'email': email,
+                'id': author_id,
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name,
+                'is_subscribed': author_id in membership.follows,
+            },
+            'ingredients': ingredients.get(recipe_id, []),
+            'is_favorited': recipe_id in membership.favorites,
+            'is_in_shopping_cart': recipe_id in membership.carts,
+            'name': name,
+            'image': image_url,
+            'image_variants': image_variants,
+            'text': text,
+            'cooking_time': cooking_time,
+        })
+    return data
@@ -0,0 +1,386 @@
+import json
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user.models import Follow, User
+
+# Картинка 1x1 для создания рецепта.
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAA'
+    'AADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+# Числа ингредиентов в рецептах, которые создаёт bench_api: время
+# создания не должно расти с их числом.
+RECIPE_SIZES = (1, 10, 30)
+
+# token - ключ контекста с токеном (None - анонимный запрос), data -
+# функция от контекста, save - (ключ контекста, поле ответа).
+Step = namedtuple(
+    'Step',
+    'name method path token data status save',
+    defaults=('token', None, 200, None)
+)
+
+SCENARIOS = (
+    (Step('tags_list', 'get', '/api/tags/'),),
+    (Step('tags_detail', 'get', '/api/tags/{tag_id}/'),),
+    (Step('ingredients_list', 'get', '/api/ingredients/'),),
+    (Step('ingredients_search', 'get', '/api/ingredients/?name={prefix}'),),
+    (Step('ingredients_detail', 'get',
+          '/api/ingredients/{ingredient_id}/'),),
+    (Step('recipes_list_anonymous', 'get', '/api/recipes/', None),),
+    (Step('recipes_list', 'get', '/api/recipes/'),),
+    (Step('recipes_list_filtered', 'get',
+          '/api/recipes/?tags={tag_slug}&is_favorited=1'),),
+    (Step('recipes_list_cursor', 'get', '/api/recipes/?cursor='),),
+    (Step('recipes_search', 'get', '/api/recipes/?search={word}'),),
+    (Step('recipes_detail', 'get', '/api/recipes/{recipe_id}/'),),
+    (Step('recipes_feed', 'get', '/api/recipes/feed/'),),
+    *(
+        (Step(f'shopping_cart_{file_format}', 'get',
+              '/api/recipes/download_shopping_cart/?format='
+              + file_format),)
+        for file_format in ('txt', 'csv', 'json', 'pdf')
+    ),
+    (Step('subscriptions', 'get', '/api/users/?recipes_limit=3'),),
+    (Step('users_me', 'get', '/api/users/me/'),),
+    (Step('users_detail', 'get', '/api/users/{author_id}/'),),
+    (Step('cache_stats', 'get', '/api/cache-stats/', 'staff_token'),),
+    (Step('metrics', 'get', '/api/metrics/', 'staff_token'),),
+    (
+        Step('favorite_add', 'post', '/api/recipes/{free_recipe_id}/favorite/',
+             status=201),
+        Step('favorite_remove', 'delete',
+             '/api/recipes/{free_recipe_id}/favorite/', status=204),
+    ),
+    (
+        Step('cart_add', 'post',
+             '/api/recipes/{free_recipe_id}/shopping_cart/', status=201),
+        Step('cart_remove', 'delete',
+             '/api/recipes/{free_recipe_id}/shopping_cart/', status=204),
+    ),
+    *(
+        (
+            Step(f'{name}_bulk_add', 'post', f'/api/{name}/bulk/',
+                 data=lambda context: {
+                     'recipes': [context['free_recipe_id']]
+                 }),
+            Step(f'{name}_bulk_remove', 'delete', f'/api/{name}/bulk/',
+                 data=lambda context: {
+                     'recipes': [context['free_recipe_id']]
+                 }),
+        )
+        for name in ('favorites', 'shopping_cart')
+    ),
+    (
+        Step('subscribe', 'post', '/api/users/{author_id}/subscribe/',
+             status=201),
+        Step('unsubscribe', 'delete', '/api/users/{author_id}/subscribe/',
+             status=204),
+    ),
+    (
+        Step('recipe_create', 'post', '/api/recipes/',
+             data=lambda context: context['recipe_data'], status=201,
+             save=('new_recipe_id', 'id')),
+        Step('recipe_update', 'patch', '/api/recipes/{new_recipe_id}/',
+             data=lambda context: context['recipe_data']),
+        Step('recipe_delete', 'delete', '/api/recipes/{new_recipe_id}/',
+             status=204),
+    ),
+    *(
+        (
+            Step(f'recipe_create_{size}', 'post', '/api/recipes/',
+                 data=lambda context, size=size: (
+                     context['sized_recipe_data'][size]
+                 ),
+                 status=201, save=('new_recipe_id', 'id')),
+            Step(f'recipe_delete_{size}', 'delete',
+                 '/api/recipes/{new_recipe_id}/', status=204),
+        )
+        for size in RECIPE_SIZES
+    ),
+    (
+        Step('token_login', 'post', '/api/auth/token/login/', None,
+             data=lambda context: {
+                 'email': context['login_email'],
+                 'password': context['password'],
+             },
+             save=('login_token', 'auth_token')),
+        Step('set_password', 'post', '/api/users/set_password/',
+             'login_token',
+             data=lambda context: {
+                 'current_password': context['password'],
+                 'new_password': context['password'],
+             },
+             status=204),
+        Step('token_logout', 'post', '/api/auth/token/logout/',
+             'login_token', status=204),
+    ),
+)
+
+
+def percentile(values, point):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[point - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты API через тестовый клиент и измеряет '
+        'время ответа (p50, p95), число запросов к базе и память на '
+        'запрос. Изменяющие запросы выполняются по-настоящему, поэтому '
+        'запускайте на базе, заполненной seed_bench.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Число замеряемых прогонов каждого маршрута.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Число прогонов для прогрева кэшей, без замера.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого идут запросы; '
+                 'по умолчанию - первый с подписками и корзиной.'
+        )
+        parser.add_argument(
+            '--password',
+            default='bench-password',
+            help='Пароль пользователей для входа по токену.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения.'
+        )
+
+    def get_user(self, email):
+        users = User.objects.filter(is_active=True)
+        if email:
+            return users.filter(email=email).first()
+        return users.filter(
+            id__in=Follow.objects.values('user')
+        ).filter(
+            id__in=ShoppingCart.objects.values('user')
+        ).order_by('id').first()
+
+    def get_context(self, options):
+        user = self.get_user(options['user'])
+        if user is None:
+            raise CommandError('Нет подходящего пользователя; '
+                               'заполните базу командой seed_bench')
+        login_user = User.objects.filter(
+            is_active=True, is_staff=False
+        ).exclude(id=user.id).order_by('-id').first()
+        if login_user is None or not login_user.check_password(
+                options['password']):
+            raise CommandError('Пароль --password не подходит к '
+                               'пользователям базы')
+        staff = User.objects.filter(is_active=True, is_staff=True).first()
+        recipes = Recipe.objects.order_by('-favorites_count', '-id')
+        recipe = recipes.first()
+        free_recipe = recipes.exclude(favorites__user=user).exclude(
+            carts__user=user
+        ).exclude(author=user).first()
+        author = User.objects.exclude(id=user.id).exclude(
+            following__user=user
+        ).order_by('-followers_count', 'id').first()
+        tag = Tag.objects.order_by('id').first()
+        ingredients = list(
+            Ingredient.objects.annotate(
+                recipes_number=Count('recipeingredients')
+            ).order_by('-recipes_number', 'id')[:max(RECIPE_SIZES)]
+        )
+        if (None in (recipe, free_recipe, author, tag)
+                or len(ingredients) < max(RECIPE_SIZES)):
+            raise CommandError('В базе не хватает данных; '
+                               'заполните её командой seed_bench')
+        return {
+            'token': Token.objects.get_or_create(user=user)[0].key,
+            'staff_token': (
+                Token.objects.get_or_create(user=staff)[0].key
+                if staff else None
+            ),
+            'password': options['password'],
+            'login_email': login_user.email,
+            'recipe_id': recipe.id,
+            'free_recipe_id': free_recipe.id,
+            'author_id': author.id,
+            'tag_id': tag.id,
+            'tag_slug': tag.slug,
+            'ingredient_id': ingredients[0].id,
+            'prefix': ingredients[0].name[:3],
+            'word': recipe.name.split()[0],
+            'recipe_data': self.get_recipe_data(tag, ingredients[:2]),
+            'sized_recipe_data': {
+                size: self.get_recipe_data(tag, ingredients[:size])
+                for size in RECIPE_SIZES
+            },
+        }
+
+    @staticmethod
+    def get_recipe_data(tag, ingredients):
+        return {
+            'name': 'Рецепт для замера',
+            'text': 'Создаётся и удаляется командой bench_api.',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [tag.id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients
+            ],
+        }
+
+    def run_step(self, step, context):
+        headers = {}
+        if step.token is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Token {context[step.token]}'
+        data = step.data(context) if step.data else None
+        response = getattr(self.client, step.method)(
+            step.path.format(**context), data, format='json', **headers
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code != step.status:
+            raise CommandError(
+                f'{step.name}: ответ {response.status_code} вместо '
+                f'{step.status}: {response.content[:500]!r}'
+            )
+        if step.save:
+            key, field = step.save
+            context[key] = response.json()[field]
+        return response
+
+    def get_scenarios(self, context):
+        if context['staff_token'] is None:
+            self.stderr.write('Нет активного администратора - '
+                              'служебные маршруты пропущены')
+            return [
+                scenario for scenario in SCENARIOS
+                if scenario[0].token != 'staff_token'
+            ]
+        return SCENARIOS
+
+    def measure_time(self, scenarios, context, options):
+        timings = {}
+        for iteration in range(options['warmup'] + options['iterations']):
+            for scenario in scenarios:
+                for step in scenario:
+                    started = time.perf_counter()
+                    self.run_step(step, context)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if iteration >= options['warmup']:
+                        timings.setdefault(step.name, []).append(elapsed)
+        return timings
+
+    def measure_resources(self, scenarios, context):
+        """Отдельный прогон: учёт запросов и tracemalloc искажают время."""
+        resources = {}
+        tracemalloc.start()
+        try:
+            for scenario in scenarios:
+                for step in scenario:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    with CaptureQueriesContext(connection) as queries:
+                        self.run_step(step, context)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    resources[step.name] = {
+                        'queries': len(queries),
+                        'memory_kb': round((peak - before) / 1024, 1),
+                    }
+        finally:
+            tracemalloc.stop()
+        return resources
+
+    def write_report(self, results):
+        self.stdout.write(
+            f'{"маршрут":<26}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"запросов":>10}{"память, КБ":>12}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<26}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["queries"]:>10}'
+                f'{result["memory_kb"]:>12.1f}'
+            )
+
+    def write_comparison(self, results, path):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['results']
+        self.stdout.write(
+            f'\n{"маршрут":<26}{"p50":>10}{"p95":>10}{"запросов":>10}'
+        )
+        for name, result in results.items():
+            old = previous.get(name)
+            if old is None:
+                continue
+            changes = [
+                f'{(result[key] / old[key] - 1) * 100:+.0f}%'
+                if old[key] else '-'
+                for key in ('p50_ms', 'p95_ms')
+            ]
+            self.stdout.write(
+                f'{name:<26}{changes[0]:>10}{changes[1]:>10}'
+                f'{result["queries"] - old["queries"]:>+10}'
+            )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('Неверное число прогонов')
+        self.client = APIClient()
+        context = self.get_context(options)
+        scenarios = self.get_scenarios(context)
+        timings = self.measure_time(scenarios, context, options)
+        resources = self.measure_resources(scenarios, context)
+        results = {
+            name: {
+                'p50_ms': round(percentile(values, 50), 3),
+                'p95_ms': round(percentile(values, 95), 3),
+                'mean_ms': round(statistics.fmean(values), 3),
+                **resources[name],
+            }
+            for name, values in timings.items()
+        }
+        self.write_report(results)
+        if options['compare']:
+            self.write_comparison(results, options['compare'])
+        if options['output']:
+            report = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'vendor': connection.vendor,
+                    'debug': settings.DEBUG,
+                    'iterations': options['iterations'],
+                    'warmup': options['warmup'],
+                    'recipes': Recipe.objects.count(),
+                    'users': User.objects.count(),
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,156 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from .bench_api import percentile
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/recipes/?cursor=',
+)
+
+
+def parse_target(value):
+    name, _, url = value.partition('=')
+    split = urlsplit(url)
+    if not name or split.scheme not in ('http', 'https'):
+        raise CommandError(f'Цель {value!r} должна выглядеть как имя=URL')
+    return name, split
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенные серверы параллельными GET-запросами и '
+        'сравнивает пропускную способность и задержки, например gunicorn '
+        'под WSGI и uvicorn под ASGI с ASYNC_READ_VIEWS: '
+        'bench_concurrency wsgi=http://127.0.0.1:8000 '
+        'asgi=http://127.0.0.1:8001. Клиент сам занимает процессор, '
+        'поэтому запускайте его не на машине с сервером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='+',
+            type=parse_target,
+            help='Серверы в виде имя=URL.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            nargs='+',
+            type=int,
+            default=[1, 16, 64],
+            help='Числа одновременных клиентов.'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10.0,
+            help='Длительность каждого замера в секундах.'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Запрашиваемые пути по кругу; по умолчанию - чтение '
+                 'тегов, ингредиентов и рецептов.'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для заголовка Authorization.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON.'
+        )
+
+    def client(self, target, paths, headers, deadline):
+        """Один клиент: запросы подряд по одному соединению до deadline.
+        Если сервер закрывает соединение, http.client открывает новое."""
+        connection_class = (
+            HTTPSConnection if target.scheme == 'https' else HTTPConnection
+        )
+        connection = connection_class(target.netloc, timeout=30)
+        results = []
+        number = 0
+        while time.monotonic() < deadline:
+            path = target.path.rstrip('/') + paths[number % len(paths)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (HTTPException, OSError):
+                connection.close()
+                ok = False
+            results.append((time.perf_counter() - started, ok))
+        connection.close()
+        return results
+
+    def measure(self, target, concurrency, options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        paths = options['paths'] or DEFAULT_PATHS
+        deadline = time.monotonic() + options['duration']
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(self.client, target, paths, headers, deadline)
+                for _ in range(concurrency)
+            ]
+            results = [
+                result for future in futures for result in future.result()
+            ]
+        latencies = [elapsed * 1000 for elapsed, ok in results if ok]
+        return {
+            'requests': len(results),
+            'errors': len(results) - len(latencies),
+            'rps': round(len(latencies) / options['duration'], 1),
+            'p50_ms': round(percentile(latencies, 50), 2)
+            if latencies else None,
+            'p95_ms': round(percentile(latencies, 95), 2)
+            if latencies else None,
+        }
+
+    def handle(self, *args, **options):
+        if options['duration'] <= 0 or min(options['concurrency']) < 1:
+            raise CommandError('Неверная длительность или число клиентов')
+        self.stdout.write(
+            f'{"сервер":<12}{"клиентов":>10}{"запрос/с":>10}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"ошибок":>8}'
+        )
+        results = {}
+        for name, target in options['targets']:
+            for concurrency in options['concurrency']:
+                result = self.measure(target, concurrency, options)
+                results.setdefault(name, {})[concurrency] = result
+                self.stdout.write(
+                    f'{name:<12}{concurrency:>10}{result["rps"]:>10}'
+                    f'{result["p50_ms"] or "-":>10}'
+                    f'{result["p95_ms"] or "-":>10}{result["errors"]:>8}'
+                )
+        if options['output']:
+            report = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'duration': options['duration'],
+                    'paths': options['paths'] or list(DEFAULT_PATHS),
+                    'targets': {
+                        name: target.geturl()
+                        for name, target in options['targets']
+                    },
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
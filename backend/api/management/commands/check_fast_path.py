@@ -0,0 +1,123 @@
+import time
+
+from api.fastpath import build_recipes
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeGetSerializer
+from api.utils import setup_eager_loading
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Favorite, Recipe, ShoppingCart
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIRequestFactory
+from user.models import Follow, User
+
+
+def find_difference(expected, actual):
+    position = next(
+        (index for index, (left, right) in enumerate(zip(expected, actual))
+         if left != right),
+        min(len(expected), len(actual))
+    )
+    start = max(position - 80, 0)
+    return (
+        f'позиция {position}:\n'
+        f'  сериализатор: {expected[start:position + 80]!r}\n'
+        f'  быстрый путь: {actual[start:position + 80]!r}'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет байт в байт JSON списков рецептов из RecipeGetSerializer '
+        'и JSONRenderer с JSON из api.fastpath и FastJSONRenderer для '
+        'анонима и пользователей с избранным, корзиной и подписками. '
+        'Запускайте на базе, заполненной seed_bench.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=5,
+            help='Сколько пользователей проверить, кроме анонима.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Число рецептов в одном сравниваемом списке.'
+        )
+
+    def get_users(self, number):
+        users = User.objects.filter(
+            id__in=Favorite.objects.values('user')
+        ).filter(
+            id__in=ShoppingCart.objects.values('user')
+        ).filter(
+            id__in=Follow.objects.values('user')
+        ).order_by('id')[:number]
+        return [AnonymousUser(), *users]
+
+    def get_request(self, user):
+        request = self.factory.get('/api/recipes/')
+        request.user = user
+        return request
+
+    def compare(self, recipe_ids, user):
+        """Каждый путь получает свой запрос, чтобы не делить множества
+        Membership."""
+        recipes = setup_eager_loading(
+            Recipe.objects.filter(id__in=recipe_ids), RecipeGetSerializer
+        ).order_by('id')
+        started = time.perf_counter()
+        expected = JSONRenderer().render(ListSerializer(
+            list(recipes),
+            child=RecipeGetSerializer(),
+            context={'request': self.get_request(user)}
+        ).data)
+        serializer_time = time.perf_counter() - started
+        started = time.perf_counter()
+        actual = FastJSONRenderer().render(
+            build_recipes(recipe_ids, self.get_request(user))
+        )
+        fast_time = time.perf_counter() - started
+        return expected, actual, serializer_time, fast_time
+
+    def handle(self, *args, **options):
+        if options['users'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Неверное число пользователей или рецептов')
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not recipe_ids:
+            raise CommandError('В базе нет рецептов; '
+                               'заполните её командой seed_bench')
+        batch_size = options['batch_size']
+        self.factory = APIRequestFactory()
+        mismatches = []
+        serializer_total = fast_total = 0
+        for user in self.get_users(options['users']):
+            for start in range(0, len(recipe_ids), batch_size):
+                batch = recipe_ids[start:start + batch_size]
+                expected, actual, serializer_time, fast_time = self.compare(
+                    batch, user
+                )
+                serializer_total += serializer_time
+                fast_total += fast_time
+                if expected != actual:
+                    mismatches.append(
+                        f'пользователь {user.id}, рецепты {batch[0]}-'
+                        f'{batch[-1]}, ' + find_difference(expected, actual)
+                    )
+        self.stdout.write(
+            f'Сериализатор: {serializer_total * 1000:.0f} мс, '
+            f'быстрый путь: {fast_total * 1000:.0f} мс'
+        )
+        if mismatches:
+            raise CommandError(
+                'Ответы различаются:\n' + '\n'.join(mismatches)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Совпадают все {len(recipe_ids)} рецептов'
+        ))
@@ -0,0 +1,129 @@
+import re
+
+from api.utils import limit_recipes_per_author
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListLine, TimelineEntry)
+from user.models import Follow, User
+
+# Запросы, которые выполняются на каждой странице API. Параметры условные:
+# план зависит от индексов и статистики, а не от того, есть ли такие строки.
+HOT_QUERIES = {
+    'recipes_by_author': lambda: Recipe.objects.filter(
+        author_id=1
+    ).order_by('-id')[:6],
+    'recipes_by_tag': lambda: Recipe.objects.filter(
+        tags__slug='breakfast'
+    ).order_by('-id')[:6],
+    'recipe_ingredients': lambda: RecipeIngredient.objects.filter(
+        recipe_id__in=(1, 2, 3)
+    ).select_related('ingredient'),
+    'recipe_tags': lambda: Recipe.tags.through.objects.filter(
+        recipe_id__in=(1, 2, 3)
+    ).select_related('tag'),
+    'recipes_with_ingredient': lambda: Recipe.objects.filter(
+        ingredients=1
+    ).values('id'),
+    'favorites_of_user': lambda: Favorite.objects.filter(
+        user_id=1
+    ).values_list('recipe_id', flat=True),
+    'carts_of_user': lambda: ShoppingCart.objects.filter(
+        user_id=1
+    ).values_list('recipe_id', flat=True),
+    'carts_of_recipe': lambda: ShoppingCart.objects.filter(
+        recipe_id=1
+    ).values_list('user_id', flat=True),
+    'follows_of_user': lambda: Follow.objects.filter(
+        user_id=1
+    ).values_list('author_id', flat=True),
+    'followers_of_author': lambda: Follow.objects.filter(
+        author_id=1
+    ).values_list('user_id', flat=True),
+    'subscriptions': lambda: User.objects.filter(
+        following__user_id=1
+    ).order_by('id')[:6],
+    'limited_recipes': lambda: limit_recipes_per_author((1, 2, 3), 3),
+    'shopping_list': lambda: ShoppingListLine.objects.filter(
+        user_id=1
+    ).values_list('ingredient__name', 'total_amount'),
+    'timeline': lambda: TimelineEntry.objects.filter(
+        user_id=1, recipe_id__lt=1000
+    ).order_by('-recipe_id').values_list('recipe_id', flat=True)[:7],
+    'ingredient_prefix': lambda: Ingredient.objects.filter(
+        name__startswith='мук'
+    )[:10],
+}
+# На SQLite LIKE не учитывает регистр и не использует обычный индекс.
+VENDOR_SKIPS = {
+    'sqlite': {'ingredient_prefix'},
+}
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?!.*\bINDEX\b)(\w+)'),
+}
+
+
+def get_plan(queryset):
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic():
+        # На маленькой базе планировщик выбирает Seq Scan даже при
+        # подходящем индексе; без него Seq Scan значит, что индекса нет.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def find_full_scans(plan):
+    """Таблицы, которые план читает целиком. SQLite называет SCAN и проход
+    по подзапросу - такие имена отбрасываются."""
+    table_names = set(connection.introspection.table_names())
+    return [
+        table for table in SEQUENTIAL_SCAN[connection.vendor].findall(plan)
+        if table in table_names
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит планы горячих запросов API и завершается ошибкой, если '
+        'какой-то из них читает таблицу целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Имена запросов; по умолчанию - все.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            raise CommandError(
+                f'База {connection.vendor} не поддерживается'
+            )
+        names = options['names'] or list(HOT_QUERIES)
+        unknown = set(names) - HOT_QUERIES.keys()
+        if unknown:
+            raise CommandError(
+                'Неизвестные запросы: ' + ', '.join(sorted(unknown))
+            )
+        skipped = VENDOR_SKIPS.get(connection.vendor, set())
+        regressions = []
+        for name in names:
+            if name in skipped:
+                continue
+            plan = get_plan(HOT_QUERIES[name]())
+            tables = find_full_scans(plan)
+            if tables:
+                regressions.append(f'{name}: {", ".join(tables)}')
+            if tables or options['verbosity'] > 1:
+                self.stdout.write(f'{name}:\n{plan}\n')
+        if regressions:
+            raise CommandError(
+                'Полное чтение таблиц в планах:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено запросов: {len(set(names) - skipped)}'
+        ))
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import cached_property
+from recipes.models import Favorite, ShoppingCart
+from user.models import Follow
+
+
+class Membership:
+    """Множества id избранного, списка покупок и подписок пользователя.
+    Каждое множество загружается одним запросом при первом обращении
+    и живёт до конца обработки запроса."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def _ids(self, model, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(
+            model.objects.filter(user=self.user).order_by().values_list(
+                field, flat=True
+            )
+        )
+
+    @cached_property
+    def favorites(self):
+        return self._ids(Favorite, 'recipe_id')
+
+    @cached_property
+    def carts(self):
+        return self._ids(ShoppingCart, 'recipe_id')
+
+    @cached_property
+    def follows(self):
+        return self._ids(Follow, 'author_id')
+
+    def is_favorited(self, recipe):
+        return recipe.id in self.favorites
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.id in self.carts
+
+    def is_subscribed(self, author):
+        return author.id in self.follows
+
+
+def get_membership(request):
+    """Возвращает Membership, закреплённый за текущим запросом."""
+    if request is None:
+        return Membership(AnonymousUser())
+    membership = getattr(request, '_membership', None)
+    if membership is None:
+        membership = Membership(request.user)
+        request._membership = membership
+    return membership
@@ -0,0 +1,147 @@
+"""Гистограммы времени ответа по маршрутам в текстовом формате Prometheus.
+
+Воркер копит наблюдения в памяти и раз в METRICS_FLUSH_INTERVAL секунд
+прибавляет их к счётчикам в общем кэше, поэтому /api/metrics/ отдаёт
+сумму по всем воркерам, а запрос не ждёт обращений к кэшу.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время ответа целиком', SECONDS_BUCKETS
+    ),
+    'request_db_seconds': (
+        'Время SQL-запросов', SECONDS_BUCKETS
+    ),
+    'request_view_seconds': (
+        'Время вьюхи без SQL и сериализации', SECONDS_BUCKETS
+    ),
+    'request_serialize_seconds': (
+        'Время сериализации ответа без SQL', SECONDS_BUCKETS
+    ),
+    'request_render_seconds': (
+        'Время рендеринга ответа', SECONDS_BUCKETS
+    ),
+    'request_db_queries': (
+        'Число SQL-запросов', QUERIES_BUCKETS
+    ),
+}
+METRIC_PREFIX = 'foodgram_'
+ROUTES_KEY = 'metrics:routes'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# incr работает только с целыми, поэтому суммы хранятся в миллионных.
+SUM_SCALE = 10 ** 6
+
+
+def bucket_key(route, name, index):
+    return f'metrics:{route}:{name}:{index}'
+
+
+def sum_key(route, name):
+    return f'metrics:{route}:{name}:sum'
+
+
+def add_to_counter(key, delta):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Счётчик вытеснили между add и incr.
+        cache.add(key, delta, timeout=None)
+
+
+class MetricsRegistry:
+    """Наблюдения текущего воркера, ещё не перенесённые в кэш."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.routes = set()
+        self.flushed_at = time.monotonic()
+
+    def add(self, route, values):
+        """values - словарь {имя гистограммы: наблюдение}. Возвращает
+        True, если пора переносить наблюдения в кэш."""
+        with self.lock:
+            self.routes.add(route)
+            for name, value in values.items():
+                index = bisect_left(HISTOGRAMS[name][1], value)
+                for key, delta in (
+                    (bucket_key(route, name, index), 1),
+                    (sum_key(route, name), round(value * SUM_SCALE)),
+                ):
+                    self.pending[key] = self.pending.get(key, 0) + delta
+            return (
+                time.monotonic() - self.flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL
+            )
+
+    def observe(self, route, values):
+        if self.add(route, values):
+            self.flush()
+
+    async def aobserve(self, route, values):
+        # Перенос - это десятки обращений к кэшу, поэтому он идёт
+        # в потоке, а не в цикле событий.
+        if self.add(route, values):
+            await sync_to_async(self.flush)()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            routes = set(self.routes)
+            self.flushed_at = time.monotonic()
+        for key, delta in pending.items():
+            if delta:
+                add_to_counter(key, delta)
+        known = cache.get(ROUTES_KEY, set())
+        if not routes <= known:
+            cache.set(ROUTES_KEY, known | routes, timeout=None)
+
+
+registry = MetricsRegistry()
+
+
+def format_bound(bound):
+    return repr(float(bound))
+
+
+def render_histogram(name, routes):
+    help_text, buckets = HISTOGRAMS[name]
+    metric = METRIC_PREFIX + name
+    lines = [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+    for route in routes:
+        keys = [
+            bucket_key(route, name, index)
+            for index in range(len(buckets) + 1)
+        ]
+        values = cache.get_many(keys + [sum_key(route, name)])
+        count = 0
+        for bound, key in zip(
+            [format_bound(bound) for bound in buckets] + ['+Inf'], keys
+        ):
+            count += values.get(key, 0)
+            lines.append(
+                f'{metric}_bucket{{route="{route}",le="{bound}"}} {count}'
+            )
+        total = values.get(sum_key(route, name), 0) / SUM_SCALE
+        lines.append(f'{metric}_sum{{route="{route}"}} {total}')
+        lines.append(f'{metric}_count{{route="{route}"}} {count}')
+    return lines
+
+
+def render_metrics():
+    registry.flush()
+    routes = sorted(cache.get(ROUTES_KEY, ()))
+    lines = []
+    for name in HISTOGRAMS:
+        lines.extend(render_histogram(name, routes))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,258 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.viewsets import ViewSetMixin
+
+from .metrics import registry
+from .replicas import (ReplicaReads, ais_sticky, astick_to_primary,
+                       is_sticky, replica_reads, stick_to_primary)
+
+# Замеры текущего запроса. Контекст копируется в потоки sync_to_async,
+# поэтому запросы к базе из синхронного кода ASGI-вьюх тоже учитываются.
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Время этапов одного запроса в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.view_started = None
+        self.view_db = 0.0
+        self.serialize_started = None
+        self.serialize_db = 0.0
+        self.render_started = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db = self.db
+
+    def stop_view(self):
+        if self.view_started is None:
+            return
+        self.stop_serialize()
+        self.view = max(
+            time.perf_counter() - self.view_started
+            - (self.db - self.view_db) - self.serialize,
+            0.0
+        )
+        self.view_started = None
+
+    def start_serialize(self):
+        if self.serialize_started is None:
+            self.serialize_started = time.perf_counter()
+            self.serialize_db = self.db
+
+    def stop_serialize(self):
+        if self.serialize_started is None:
+            return
+        self.serialize += max(
+            time.perf_counter() - self.serialize_started
+            - (self.db - self.serialize_db),
+            0.0
+        )
+        self.serialize_started = None
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def stop_render(self, response):
+        self.render = time.perf_counter() - self.render_started
+
+    def get_header(self, total):
+        return ', '.join((
+            f'db;desc="SQL x{self.queries}";dur={self.db * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'render;dur={self.render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+def time_query(execute, sql, params, many, context):
+    """Обёртка execute_wrapper, которую api.signals ставит на каждое
+    соединение с базой."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute(execute, sql, params, many, context)
+
+
+class HybridMiddleware:
+    """Основа middleware, которая работает и под WSGI, и под ASGI без
+    перехода в поток. Наследник задаёт start, stop и finish, а для finish
+    и хуков process_* - асинхронные варианты afinish и aprocess_*, если
+    они обращаются к кэшу или базе. start и stop выполняются в цикле
+    событий и не должны делать ввода-вывода."""
+    sync_capable = True
+    async_capable = True
+    hooks = ('process_view', 'process_template_response')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            for hook in self.hooks:
+                if hasattr(self, hook):
+                    setattr(self, hook, getattr(self, f'a{hook}'))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        state = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop(request, state)
+        return self.finish(request, response)
+
+    async def acall(self, request):
+        state = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.stop(request, state)
+        return await self.afinish(request, response)
+
+    def start(self, request):
+        return None
+
+    def stop(self, request, state):
+        pass
+
+    def finish(self, request, response):
+        return response
+
+    async def afinish(self, request, response):
+        return self.finish(request, response)
+
+
+class ServerTimingMiddleware(HybridMiddleware):
+    """Замеряет SQL (число и время запросов), вьюху, сериализацию,
+    рендеринг и ответ целиком. Результат уходит в заголовок Server-Timing
+    и в гистограммы по имени маршрута, например api:recipes-list.
+
+    Сериализатор DRF выполняется внутри вьюхи и сам вызывает ленивые
+    запросы, поэтому вьюха и сериализация считаются за вычетом SQL,
+    а время сериализации отмечает SerializeTimingMixin вьюсета. Тело
+    StreamingHttpResponse отдаётся уже после middleware и не замеряется.
+    Работает и под WSGI, и под ASGI без перехода в поток.
+    """
+    def start(self, request):
+        request.timings = RequestTimings()
+        return current_timings.set(request.timings)
+
+    def stop(self, request, token):
+        current_timings.reset(token)
+
+    def measure(self, request, response):
+        """Ставит Server-Timing и возвращает маршрут и наблюдения."""
+        timings = request.timings
+        timings.stop_view()
+        total = time.perf_counter() - timings.started
+        response['Server-Timing'] = timings.get_header(total)
+        match = request.resolver_match
+        return match.view_name if match else 'unmatched', {
+            'request_duration_seconds': total,
+            'request_db_seconds': timings.db,
+            'request_view_seconds': timings.view,
+            'request_serialize_seconds': timings.serialize,
+            'request_render_seconds': timings.render,
+            'request_db_queries': timings.queries,
+        }
+
+    def finish(self, request, response):
+        registry.observe(*self.measure(request, response))
+        return response
+
+    async def afinish(self, request, response):
+        await registry.aobserve(*self.measure(request, response))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.start_view()
+
+    def process_template_response(self, request, response):
+        # Middleware стоит первой, поэтому этот обработчик вызывается
+        # последним, прямо перед рендерингом.
+        request.timings.stop_view()
+        request.timings.start_render()
+        response.add_post_render_callback(request.timings.stop_render)
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        request.timings.start_view()
+
+    async def aprocess_template_response(self, request, response):
+        request.timings.stop_view()
+        request.timings.start_render()
+        response.add_post_render_callback(request.timings.stop_render)
+        return response
+
+
+class ReplicaMiddleware(HybridMiddleware):
+    """Безопасные запросы к вьюсетам API читают с реплик, если клиент
+    недавно ничего не изменял (см. api.replicas)."""
+
+    def start(self, request):
+        # Переменная ставится и сбрасывается на одном пути вызова:
+        # process_view под ASGI может выполняться в другом контексте.
+        request.replica_reads = ReplicaReads()
+        return replica_reads.set(request.replica_reads)
+
+    def stop(self, request, token):
+        replica_reads.reset(token)
+
+    @staticmethod
+    def reads_viewset(request, view_func):
+        view_class = getattr(view_func, 'cls', None)
+        return (
+            request.method in SAFE_METHODS
+            and isinstance(view_class, type)
+            and issubclass(view_class, ViewSetMixin)
+        )
+
+    @staticmethod
+    def changes_data(request, response):
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (self.reads_viewset(request, view_func)
+                and not is_sticky(request)):
+            request.replica_reads.allowed = True
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        if (self.reads_viewset(request, view_func)
+                and not await ais_sticky(request)):
+            request.replica_reads.allowed = True
+
+    def finish(self, request, response):
+        if self.changes_data(request, response):
+            stick_to_primary(request, response)
+        return response
+
+    async def afinish(self, request, response):
+        if self.changes_data(request, response):
+            await astick_to_primary(request, response)
+        return response
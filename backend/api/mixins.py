@@ -1,4 +1,23 @@
-from rest_framework import mixins, viewsets
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, Max
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from .cache import count_cache_access, get_user_versions, get_version
+from .middleware import current_timings
+from .replicas import replica_may_lag
+from .utils import setup_eager_loading
 
 
 class ListRetrieveCreateViewSet(
@@ -8,3 +27,455 @@ class ListRetrieveCreateViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class EagerLoadingMixin:
+    """Дополняет queryset вьюсета связями, которые объявил сериализатор."""
+
+    def get_eager_loading_serializer_class(self):
+        return self.get_serializer_class()
+
+    def get_queryset(self):
+        return setup_eager_loading(
+            super().get_queryset(),
+            self.get_eager_loading_serializer_class()
+        )
+
+
+class SerializeTimingMixin:
+    """Отмечает для ServerTimingMiddleware время сериализации ответа:
+    от создания сериализатора для вывода до get_paginated_response или
+    finalize_response."""
+
+    def get_serializer(self, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is not None and 'data' not in kwargs:
+            timings.start_serialize()
+        return super().get_serializer(*args, **kwargs)
+
+    @staticmethod
+    def stop_serialize():
+        timings = current_timings.get()
+        if timings is not None:
+            timings.stop_serialize()
+
+    def get_paginated_response(self, data):
+        self.stop_serialize()
+        return super().get_paginated_response(data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self.stop_serialize()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedResponseMixin:
+    """Отдаёт ответы cached_actions готовыми байтами JSON из кэша.
+    В ключ входит версия набора данных cache_version_key, которую меняют
+    сигналы моделей, поэтому при попадании не выполняются ни запросы к базе,
+    ни сериализаторы. При cache_per_user у каждого пользователя своё
+    пространство ключей, а в ключ добавляются версии его избранного,
+    списка покупок и подписок."""
+    cache_version_key = None
+    cache_per_user = False
+    cached_actions = ('list', 'retrieve')
+
+    def get_cache_timeout(self):
+        return settings.CATALOG_CACHE_TIMEOUT
+
+    def get_cache_versions(self, request):
+        versions = (get_version(self.cache_version_key),)
+        if self.cache_per_user:
+            versions += get_user_versions(request.user)
+        return versions
+
+    def get_cache_namespace(self, request):
+        if self.cache_per_user and request.user.is_authenticated:
+            return f'user{request.user.id}'
+        return 'anonymous'
+
+    def normalize_query(self, request):
+        """Порядок параметров и повторяющихся значений не важен,
+        пустые параметры не учитываются. Исключение - курсор пагинатора:
+        пустой cursor включает курсорную навигацию с другой формой ответа."""
+        cursor = getattr(self.paginator, 'cursor_query_param', None)
+        return urlencode(sorted(
+            (name, sorted(value for value in values if value) or [''])
+            for name, values in request.query_params.lists()
+            if any(values) or name == cursor
+        ), doseq=True)
+
+    def get_response_cache_key(self, request, versions):
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return 'response:{}:{}:{}:{}:{}:{}'.format(
+            self.basename,
+            self.action,
+            lookup,
+            self.get_cache_namespace(request),
+            '-'.join(map(str, versions)),
+            hashlib.md5(self.normalize_query(request).encode()).hexdigest()
+        )
+
+    def get_cached(self, request):
+        versions = self.get_cache_versions(request)
+        key = self.get_response_cache_key(request, versions)
+        cached = cache.get(key)
+        count_cache_access(self.basename, hit=cached is not None)
+        return versions, key, cached
+
+    def cache_response(self, request, response, versions, key):
+        content = request.accepted_renderer.render(
+            response.data,
+            request.accepted_media_type,
+            self.get_renderer_context()
+        )
+        etag = response.get('ETag') or '"{}-{}"'.format(
+            self.basename, '-'.join(map(str, versions))
+        )
+        # Реплика могла ещё не получить изменение, которое сменило версию,
+        # и старые данные осели бы в кэше под новой версией.
+        if not replica_may_lag(versions):
+            cache.set(key, (content, etag), self.get_cache_timeout())
+        return content, etag
+
+    def make_cached_response(self, request, content, etag, hit):
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                content, content_type=request.accepted_renderer.media_type
+            )
+        response['ETag'] = etag
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        if self.cache_per_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def cached_response(self, request, get_response):
+        """get_response строит обычный ответ DRF при промахе кэша."""
+        if request.accepted_renderer.format != 'json':
+            return get_response()
+        versions, key, cached = self.get_cached(request)
+        if cached is None:
+            response = get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = self.cache_response(request, response, versions, key)
+            return self.make_cached_response(request, *cached, hit=False)
+        return self.make_cached_response(request, *cached, hit=True)
+
+    async def acached_response(self, request, get_response):
+        """То же для асинхронного get_response."""
+        if request.accepted_renderer.format != 'json':
+            return await get_response()
+        # Версии и ответ читаются из кэша несколькими обращениями, поэтому
+        # они идут одним переходом в поток, а не в цикле событий.
+        versions, key, cached = await sync_to_async(self.get_cached)(
+            request
+        )
+        if cached is None:
+            response = await get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = await sync_to_async(self.cache_response)(
+                request, response, versions, key
+            )
+            return self.make_cached_response(request, *cached, hit=False)
+        return self.make_cached_response(request, *cached, hit=True)
+
+    def list(self, request, *args, **kwargs):
+        get_response = partial(super().list, request, *args, **kwargs)
+        if 'list' not in self.cached_actions:
+            return get_response()
+        return self.cached_response(request, get_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if 'retrieve' not in self.cached_actions:
+            return get_response()
+        return self.cached_response(request, get_response)
+
+    async def alist(self, request, *args, **kwargs):
+        get_response = partial(super().alist, request, *args, **kwargs)
+        if 'list' not in self.cached_actions:
+            return await get_response()
+        return await self.acached_response(request, get_response)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        get_response = partial(super().aretrieve, request, *args, **kwargs)
+        if 'retrieve' not in self.cached_actions:
+            return await get_response()
+        return await self.acached_response(request, get_response)
+
+
+class ConditionalGetMixin:
+    """Условные GET (ETag, Last-Modified) для list и retrieve.
+    Состояние выборки берётся одним лёгким запросом: для списка - max
+    updated_at и число объектов после фильтрации (число потом получает
+    пагинатор вместо своего COUNT), для объекта - его updated_at.
+    При курсорной навигации состояние - id и updated_at объектов
+    страницы и ссылки на соседние страницы, так что запрос страницы
+    заменяет агрегат по всей выборке. К состоянию добавляются версии
+    избранного, списка покупок и подписок пользователя. При совпадении
+    отдаётся 304 без сериализации. Last-Modified ставится только
+    у объекта: удаление из списка не сдвигает max updated_at,
+    и If-Modified-Since бы его не заметил.
+
+    Пагинатор вьюсета - PageOrCursorPagination."""
+    last_modified_field = 'updated_at'
+    page_state_field = 'page_last_modified'
+
+    def check_conditions(self, request, state, last_modified=None):
+        """Возвращает ETag, Last-Modified и ответ 304 или None."""
+        versions = get_user_versions(request.user)
+        etag = '"{}"'.format(hashlib.md5(
+            repr((state, versions)).encode()
+        ).hexdigest())
+        if last_modified is not None:
+            # Версии - это time_ns момента изменения.
+            last_modified = max(
+                (int(last_modified.timestamp()),
+                 *(version // 10 ** 9 for version in versions))
+            )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        return etag, last_modified, response
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def conditional_response(self, request, state, get_response,
+                             last_modified=None):
+        etag, last_modified, response = self.check_conditions(
+            request, state, last_modified
+        )
+        if response is None:
+            response = get_response()
+        return self.set_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, request, state, get_response,
+                                    last_modified=None):
+        # Версии пользователя хранятся в кэше.
+        etag, last_modified, response = await sync_to_async(
+            self.check_conditions
+        )(request, state, last_modified)
+        if response is None:
+            response = await get_response()
+        return self.set_validators(response, etag, last_modified)
+
+    def get_list_state(self):
+        return dict(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk', distinct=True)
+        )
+
+    def get_page_state(self, page):
+        cursor_paginator = self.paginator.cursor_paginator
+        return (
+            [(obj.pk, getattr(obj, self.page_state_field)) for obj in page],
+            cursor_paginator.get_next_link(),
+            cursor_paginator.get_previous_link()
+        )
+
+    def get_page_queryset(self, queryset):
+        return queryset.annotate(
+            **{self.page_state_field: F(self.last_modified_field)}
+        )
+
+    def get_list_response(self, page):
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator.uses_cursor(request):
+            page = self.paginate_queryset(self.get_page_queryset(queryset))
+            return self.conditional_response(
+                request,
+                self.get_page_state(page),
+                partial(self.get_list_response, page)
+            )
+        state = queryset.aggregate(**self.get_list_state())
+        return self.conditional_response(
+            request,
+            (state['last_modified'], state['count']),
+            lambda: self.get_list_response(self.paginator.paginate_queryset(
+                queryset, request, view=self, count=state['count']
+            ))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values_list(
+                self.last_modified_field, flat=True
+            ),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(
+            request,
+            last_modified,
+            partial(super().retrieve, request, *args, **kwargs),
+            last_modified=last_modified
+        )
+
+    async def aget_list_response(self, page):
+        return self.get_paginated_response(
+            await self.aserialize(page, many=True)
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        if self.paginator.uses_cursor(request):
+            page = await self.paginator.apaginate_queryset(
+                self.get_page_queryset(queryset), request, view=self
+            )
+            return await self.aconditional_response(
+                request,
+                self.get_page_state(page),
+                partial(self.aget_list_response, page)
+            )
+        state = await queryset.aaggregate(**self.get_list_state())
+
+        async def get_response():
+            return await self.aget_list_response(
+                await self.paginator.apaginate_queryset(
+                    queryset, request, view=self, count=state['count']
+                )
+            )
+
+        return await self.aconditional_response(
+            request, (state['last_modified'], state['count']), get_response
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        last_modified = await aget_object_or_404(
+            queryset.values_list(self.last_modified_field, flat=True),
+            **{self.lookup_field: self.kwargs[
+                self.lookup_url_kwarg or self.lookup_field
+            ]}
+        )
+        return await self.aconditional_response(
+            request,
+            last_modified,
+            partial(super().aretrieve, request, *args, **kwargs),
+            last_modified=last_modified
+        )
+
+
+async def aget_object_or_404(queryset, **filters):
+    """Асинхронный аналог rest_framework.generics.get_object_or_404."""
+    try:
+        return await queryset.aget(**filters)
+    except (queryset.model.DoesNotExist, TypeError, ValueError,
+            ValidationError):
+        raise Http404
+
+
+class AsyncReadMixin:
+    """list и retrieve для ASGI: as_async_view отдаёт вьюху, которая
+    обрабатывает GET и HEAD в цикле событий, а запись передаёт обычному
+    вьюсету в потоке.
+
+    Запросы вьюсета идут через асинхронный ORM. Аутентификация по токену,
+    проверки django-filter и сериализаторы (вложенные связи, членство
+    пользователя) обращаются к базе синхронно, а кэш ответов и версий
+    синхронный у большинства бэкендов, поэтому всё это вызывается через
+    sync_to_async.
+    """
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_async_view(cls, actions, **initkwargs):
+        sync_view = cls.as_view(actions, **initkwargs)
+        read_actions = {
+            method: action for method, action in actions.items()
+            if method == 'get' and action in cls.async_actions
+        }
+        if read_actions:
+            read_actions['head'] = read_actions['get']
+
+        async def view(request, *args, **kwargs):
+            if request.method.lower() not in read_actions:
+                return await sync_to_async(sync_view)(
+                    request, *args, **kwargs
+                )
+            self = cls(**initkwargs)
+            self.action_map = read_actions
+            # Как в ViewSetMixin.as_view: по обработчикам строится Allow.
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            if 'get' in actions:
+                self.head = self.get
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        # csrf_exempt в Django 4.1 превращает корутину в обычную функцию.
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Повторяет APIView.dispatch."""
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            # Обработчик исключений из настроек может писать в базу или
+            # в лог по сети, поэтому он выполняется в потоке.
+            response = await sync_to_async(self.handle_exception)(exc)
+        # finalize_response лишь выбирает рендерер и ставит заголовки,
+        # без ввода-вывода: рендеринг идёт позже, в обработчике запроса.
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def afilter_queryset(self):
+        if not hasattr(self, '_filtered_queryset'):
+            self._filtered_queryset = await sync_to_async(
+                self.filter_queryset
+            )(self.get_queryset())
+        return self._filtered_queryset
+
+    async def aserialize(self, instance, many=False):
+        return await sync_to_async(
+            lambda: self.get_serializer(instance, many=many).data
+        )()
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        if self.paginator is None:
+            objects = [obj async for obj in queryset]
+            return Response(await self.aserialize(objects, many=True))
+        page = await self.paginator.apaginate_queryset(
+            queryset, request, view=self
+        )
+        return self.paginator.get_paginated_response(
+            await self.aserialize(page, many=True)
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = await aget_object_or_404(
+            await self.afilter_queryset(),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, instance)
+        return Response(await self.aserialize(instance))
@@ -0,0 +1,166 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from recipes.models import TimelineEntry
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """Навигация по ключу id: следующая страница ищется условием по id,
+    без OFFSET и без COUNT по всей выборке.
+    Направление сортировки задаётся атрибутом вьюсета cursor_ordering."""
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return (getattr(view, 'cursor_ordering', self.ordering),)
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """Постраничная навигация по page и limit, как ожидает фронтенд.
+    С параметром cursor (в том числе пустым - первая страница) ответ
+    строится IdCursorPagination: {next, previous, results} без count.
+    Параметры ordering_query_params задают свой порядок выборки
+    (поиск - по релевантности), который курсор по id сбросил бы, поэтому
+    с ними cursor не учитывается и страницы нумеруются."""
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = IdCursorPagination
+    ordering_query_params = ('search',)
+
+    def uses_cursor(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params and not any(
+            params.get(name, '').strip()
+            for name in self.ordering_query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None, count=None):
+        """count - уже известное число объектов выборки: с ним страница
+        не считает их повторно."""
+        self.cursor_paginator = None
+        if self.uses_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.set_page(queryset, request, page_size, count)
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None,
+                                 count=None):
+        """paginate_queryset для асинхронных вьюх: число объектов
+        и страница читаются асинхронным ORM. Курсорная навигация
+        выполняется в потоке."""
+        if self.uses_cursor(request):
+            return await sync_to_async(self.paginate_queryset)(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        if count is None:
+            count = await queryset.acount()
+        self.set_page(queryset, request, page_size, count)
+        self.page.object_list = [
+            obj async for obj in self.page.object_list
+        ]
+        return list(self.page)
+
+    def set_page(self, queryset, request, page_size, count):
+        """Выбирает страницу, как PageNumberPagination.paginate_queryset.
+        Известное число объектов count заменяет COUNT в Paginator."""
+        paginator = self.django_paginator_class(queryset, page_size)
+        if count is not None:
+            paginator.count = count
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_parameters = [
+            parameter for parameter in self.cursor_pagination_class(
+            ).get_schema_operation_parameters(view)
+            if parameter['name'] == self.cursor_query_param
+        ]
+        return (
+            super().get_schema_operation_parameters(view) + cursor_parameters
+        )
+
+
+class FeedPagination(BasePagination):
+    """Ленту подписок листает по id рецепта: курсор хранит id последнего
+    рецепта страницы, а id следующей берутся из TimelineEntry."""
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param, '')
+        if limit.isdigit() and int(limit):
+            return min(int(limit), self.max_page_size)
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return int(b64decode(encoded.encode(), validate=True))
+        except (BinasciiError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        recipe_ids = TimelineEntry.objects.get_recipe_ids(
+            request.user, self.decode_cursor(request), page_size + 1
+        )
+        self.has_next = len(recipe_ids) > page_size
+        recipe_ids = recipe_ids[:page_size]
+        recipes = queryset.in_bulk(recipe_ids)
+        self.last_id = recipe_ids[-1] if recipe_ids else None
+        return [
+            recipes[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in recipes
+        ]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            b64encode(str(self.last_id).encode()).decode()
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
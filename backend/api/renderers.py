@@ -0,0 +1,235 @@
+import csv
+import json
+from itertools import islice
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же результатом байт в байт.
+    Даты и прочие типы, которые orjson пишет по-своему, передаются
+    кодировщику DRF, а данные, которые orjson не принимает (ключи
+    не-строки, большие целые), и отступы рендерятся обычным JSONRenderer.
+    Числа с плавающей точкой orjson записывает иначе (1e16 вместо 1e+16),
+    поэтому рендерер подключается только к ответам без них."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Как JSONRenderer, экранируем разделители строк для JavaScript.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+    Сам список отдаётся потоком через stream(), а render() нужен DRF только
+    для ответов об ошибках."""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # У PDF charset нет, а JSON всегда в UTF-8.
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def stream(self, ingredients):
+        """Принимает итератор кортежей (название, единица, количество)."""
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield f'{SHOPPING_LIST_TITLE}\n'
+        for name, unit, amount in ingredients:
+            yield f'\n{name} - {amount}, {unit}'
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: write() просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield '\ufeff' + writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения')
+        )
+        for name, unit, amount in ingredients:
+            yield writer.writerow((name, amount, unit))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for name, unit, amount in ingredients:
+            yield separator + json.dumps(
+                {'name': name, 'measurement_unit': unit, 'amount': amount},
+                ensure_ascii=False
+            )
+            separator = ',\n'
+        yield '[]' if separator == '[' else ']'
+
+
+CYRILLIC_GLYPHS = (
+    [f'afii{code}' for code in range(10017, 10023)]
+    + [f'afii{code}' for code in range(10024, 10050)]
+    + [f'afii{code}' for code in range(10065, 10071)]
+    + [f'afii{code}' for code in range(10072, 10098)]
+)
+PDF_FONT_ENCODING = (
+    '<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences '
+    '[168 /afii10023 184 /afii10071 185 /afii61352 192 '
+    + ' '.join(f'/{glyph}' for glyph in CYRILLIC_GLYPHS)
+    + '] >>'
+)
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """PDF без сторонних библиотек.
+    Страницы пишутся в поток по одной: смещения объектов для таблицы xref
+    считаются по ходу, а словарь /Pages выводится последним, когда
+    известно число страниц. Кириллица кодируется в cp1251 и отображается
+    на глифы стандартного шрифта Helvetica через /Differences."""
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    page_width = 595
+    page_height = 842
+    margin = 50
+    font_size = 12
+    leading = 16
+    lines_per_page = (page_height - 2 * margin) // leading
+
+    catalog_id = 1
+    pages_id = 2
+    font_id = 3
+
+    @staticmethod
+    def escape(text):
+        data = text.encode('cp1251', errors='replace')
+        return (data.replace(b'\\', b'\\\\')
+                .replace(b'(', b'\\(')
+                .replace(b')', b'\\)'))
+
+    def stream(self, ingredients):
+        offsets = {}
+        position = 0
+
+        def write(object_id, body):
+            nonlocal position
+            offsets[object_id] = position
+            chunk = f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+            position += len(chunk)
+            return chunk
+
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        position += len(header)
+        yield header
+        yield write(
+            self.catalog_id,
+            f'<< /Type /Catalog /Pages {self.pages_id} 0 R >>'.encode()
+        )
+        yield write(
+            self.font_id,
+            ('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+             f'/Encoding {PDF_FONT_ENCODING} >>').encode()
+        )
+
+        lines = (
+            f'{name} ({unit}) - {amount}'
+            for name, unit, amount in ingredients
+        )
+        page_ids = []
+        next_id = self.font_id + 1
+        page_lines = [SHOPPING_LIST_TITLE, '']
+        page_lines.extend(islice(lines, self.lines_per_page - 2))
+        while page_lines:
+            content = b''.join(
+                b'(' + self.escape(line) + b') Tj T*\n' for line in page_lines
+            )
+            content = (
+                f'BT /F1 {self.font_size} Tf {self.leading} TL '
+                f'{self.margin} {self.page_height - self.margin} Td\n'
+            ).encode() + content + b'ET'
+            content_id, page_id = next_id, next_id + 1
+            next_id += 2
+            yield write(
+                content_id,
+                f'<< /Length {len(content)} >>\nstream\n'.encode()
+                + content + b'\nendstream'
+            )
+            yield write(
+                page_id,
+                (f'<< /Type /Page /Parent {self.pages_id} 0 R '
+                 f'/MediaBox [0 0 {self.page_width} {self.page_height}] '
+                 f'/Resources << /Font << /F1 {self.font_id} 0 R >> >> '
+                 f'/Contents {content_id} 0 R >>').encode()
+            )
+            page_ids.append(page_id)
+            page_lines = list(islice(lines, self.lines_per_page))
+
+        kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+        yield write(
+            self.pages_id,
+            (f'<< /Type /Pages /Kids [{kids}] '
+             f'/Count {len(page_ids)} >>').encode()
+        )
+        xref = [f'xref\n0 {next_id}\n', '0000000000 65535 f \n']
+        xref.extend(
+            f'{offsets[object_id]:010d} 00000 n \n'
+            for object_id in range(1, next_id)
+        )
+        yield ''.join(xref).encode()
+        yield (
+            f'trailer\n<< /Size {next_id} /Root {self.catalog_id} 0 R >>\n'
+            f'startxref\n{position}\n%%EOF\n'
+        ).encode()
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+)
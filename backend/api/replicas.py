@@ -0,0 +1,164 @@
+"""Чтение с реплик базы.
+
+ReplicaMiddleware разрешает безопасным запросам к вьюсетам API читать
+с реплик, а ReplicaRouter при первом чтении выбирает одну из реплик
+DATABASE_REPLICAS и направляет на неё все чтения запроса. Реплика,
+которая отстаёт больше REPLICA_MAX_LAG секунд или недоступна,
+пропускается; если годных нет, чтение идёт с основной базы.
+
+После успешного изменяющего запроса клиент PRIMARY_STICKY_SECONDS
+читает с основной базы и видит свои изменения: браузер помечается
+cookie, клиент с токеном - ключом в кэше.
+"""
+import hashlib
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = 'primary_sticky'
+LAG_QUERIES = {
+    'postgresql': (
+        'SELECT COALESCE(CASE '
+        'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+        'END, 0)'
+    ),
+}
+
+
+class ReplicaReads:
+    """Выбор базы для чтений одного запроса. Объект общий для потоков
+    sync_to_async, поэтому выбор делается один раз на запрос.
+    ReplicaMiddleware заводит его на каждый запрос, а allowed ставит
+    только безопасным запросам к вьюсетам."""
+
+    def __init__(self):
+        self.allowed = False
+        self.alias = None
+
+
+replica_reads = ContextVar('replica_reads', default=None)
+
+
+class ReplicaHealth:
+    """Отставание реплик, проверенное не чаще REPLICA_CHECK_INTERVAL."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+
+    def get_lag(self, alias):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_QUERIES.get(connection.vendor, 'SELECT 0'))
+            return float(cursor.fetchone()[0])
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self.lock:
+            checked = self.checked.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_CHECK_INTERVAL:
+            return checked[1]
+        try:
+            healthy = self.get_lag(alias) <= settings.REPLICA_MAX_LAG
+        except DatabaseError:
+            healthy = False
+        with self.lock:
+            self.checked[alias] = (now, healthy)
+        return healthy
+
+
+health = ReplicaHealth()
+
+
+def choose_replica():
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if health.is_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+def reading_from_replica():
+    reads = replica_reads.get()
+    return (
+        reads is not None and reads.allowed
+        and reads.alias not in (None, DEFAULT_DB_ALIAS)
+    )
+
+
+def replica_may_lag(versions):
+    """Данные с версиями versions изменились недавно, и реплика,
+    с которой идёт чтение, могла их ещё не получить."""
+    return reading_from_replica() and (
+        time.time_ns() - max(versions)
+        < settings.REPLICA_MAX_LAG * 10 ** 9
+    )
+
+
+def get_sticky_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'replica:sticky:' + hashlib.md5(
+        authorization.encode()
+    ).hexdigest()
+
+
+def is_sticky(request):
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    key = get_sticky_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+async def ais_sticky(request):
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    key = get_sticky_key(request)
+    return key is not None and await cache.aget(key) is not None
+
+
+def set_sticky_cookie(response):
+    response.set_cookie(
+        STICKY_COOKIE, '1', max_age=settings.PRIMARY_STICKY_SECONDS,
+        httponly=True, samesite='Lax'
+    )
+
+
+def stick_to_primary(request, response):
+    set_sticky_cookie(response)
+    key = get_sticky_key(request)
+    if key is not None:
+        cache.set(key, 1, settings.PRIMARY_STICKY_SECONDS)
+
+
+async def astick_to_primary(request, response):
+    set_sticky_cookie(response)
+    key = get_sticky_key(request)
+    if key is not None:
+        await cache.aset(key, 1, settings.PRIMARY_STICKY_SECONDS)
+
+
+class ReplicaRouter:
+    """Чтения запроса, которому разрешены реплики, идут на выбранную
+    реплику; всё остальное - на основную базу."""
+
+    def db_for_read(self, model, **hints):
+        reads = replica_reads.get()
+        if reads is None or not reads.allowed:
+            return DEFAULT_DB_ALIAS
+        if reads.alias is None:
+            reads.alias = choose_replica()
+        return reads.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,23 @@
+from recipes.search import search_recipes
+from rest_framework.filters import BaseFilterBackend
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск рецептов по ?search= с сортировкой
+    по релевантности."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_recipes(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Поиск по названию и описанию рецепта.',
+            'schema': {'type': 'string'},
+        }]
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListLine, Tag)
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from user.models import Follow, User
 
-from .utils import Base64ImageField, create_ingredients
+from .fastpath import build_recipes
+from .membership import get_membership
+from .utils import (Base64ImageField, ImageVariantsField, create_ingredients,
+                    get_eager_loading, get_recipes_limit,
+                    limit_recipes_per_author, update_ingredients)
 
 
 class UserSignUpSerializer(UserCreateSerializer):
@@ -28,26 +34,38 @@ class UserGetSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (request.user.is_authenticated
-                and Follow.objects.filter(
-                    user=request.user, author=obj
-                ).exists())
+        return get_membership(self.context.get('request')).is_subscribed(obj)
 
 
 class RecipeSmallSerializer(serializers.ModelSerializer):
     """Сериализатор для работы с краткой информацией о рецепте."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+class UserSubscribeListSerializer(serializers.ListSerializer):
+    """Загружает первые recipes_limit рецептов всех авторов страницы
+    одним запросом."""
+
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        recipes = limit_recipes_per_author(
+            authors, get_recipes_limit(self.context.get('request'))
+        )
+        prefetch_related_objects(
+            authors,
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+        return super().to_representation(authors)
 
 
 class UserSubscribeRepresentSerializer(UserGetSerializer):
     """"Сериализатор для предоставления информации о подписках пользователя."""
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -55,21 +73,17 @@ class UserSubscribeRepresentSerializer(UserGetSerializer):
                   'last_name', 'is_subscribed', 'recipes', 'recipes_count')
         read_only_fields = ('email', 'username', 'first_name', 'last_name',
                             'is_subscribed', 'recipes', 'recipes_count')
+        list_serializer_class = UserSubscribeListSerializer
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = None
-        if request:
-            recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes_limit = get_recipes_limit(request)
+            recipes = obj.recipes.all()[:recipes_limit]
         return RecipeSmallSerializer(recipes, many=True,
                                      context={'request': request}).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class UserSubscribeSerializer(serializers.ModelSerializer):
     """Сериализатор для подписки/отписки от пользователей."""
@@ -125,6 +139,7 @@ class IngredientGetSerializer(serializers.ModelSerializer):
         source='ingredient.measurement_unit',
         read_only=True
     )
+    select_related_fields = ('ingredient',)
 
     class Meta:
         model = RecipeIngredient
@@ -142,6 +157,17 @@ class IngredientPostSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Собирает список рецептов функцией build_recipes по id, без полей
+    RecipeGetSerializer. Объектам страницы достаточно одного поля id."""
+
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return build_recipes(
+            [recipe.id for recipe in recipes], self.context.get('request')
+        )
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
     """Сериализатор для получения информации о рецепте."""
     tags = TagSerializer(many=True, read_only=True)
@@ -151,26 +177,22 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField(required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time')
+                  'image', 'image_variants', 'text', 'cooking_time')
+        list_serializer_class = RecipeListSerializer
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and Favorite.objects.filter(
-                    user=request.user, recipe=obj
-                ).exists())
+        return get_membership(self.context.get('request')).is_favorited(obj)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and ShoppingCart.objects.filter(
-                    user=request.user, recipe=obj
-                ).exists())
+        return get_membership(
+            self.context.get('request')
+        ).is_in_shopping_cart(obj)
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -178,10 +200,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = IngredientPostSerializer(
         many=True, source='recipeingredients'
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
 
     class Meta:
@@ -189,6 +208,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         fields = ('ingredients', 'tags', 'image',
                   'name', 'text', 'cooking_time')
 
+    def validate_tags(self, value):
+        tags = Tag.objects.in_bulk(value)
+        missing = [str(tag_id) for tag_id in value if tag_id not in tags]
+        if missing:
+            raise serializers.ValidationError(
+                f'Теги не найдены: {", ".join(missing)}'
+            )
+        return [tags[tag_id] for tag_id in dict.fromkeys(value)]
+
     def validate(self, data):
         ingredients_list = []
         for ingredient in data.get('recipeingredients'):
@@ -201,6 +229,17 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Вы пытаетесь добавить в рецепт два одинаковых ингредиента'
             )
+        ingredients = Ingredient.objects.in_bulk(ingredients_list)
+        missing = [
+            str(ingredient_id) for ingredient_id in ingredients_list
+            if ingredient_id not in ingredients
+        ]
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': f'Ингредиенты не найдены: {", ".join(missing)}'
+            })
+        for ingredient in data['recipeingredients']:
+            ingredient['ingredient'] = ingredients[ingredient['id']]
         return data
 
     @transaction.atomic
@@ -217,16 +256,28 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('recipeingredients')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
         instance.tags.set(tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
+        old_amounts, new_amounts = update_ingredients(ingredients, instance)
         super().update(instance, validated_data)
-        create_ingredients(ingredients, instance)
-        instance.save()
+        ShoppingListLine.objects.change_recipe(
+            instance.id, old_amounts, new_amounts
+        )
+        return instance
+
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        # Временный файл уже перенесён хранилищем; закрываем его явно,
+        # чтобы он не пытался удалить себя при сборке мусора.
+        image = self.validated_data.get('image')
+        if image:
+            image.close()
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
+        prefetch_related_objects(
+            [instance], *get_eager_loading(RecipeGetSerializer)[1]
+        )
         return RecipeGetSerializer(
             instance,
             context={'request': request}
@@ -255,6 +306,18 @@ class FavoriteSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class ShoppingCartSerializer(serializers.ModelSerializer):
     """Сериализатор для работы со списком покупок."""
 
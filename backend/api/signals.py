@@ -0,0 +1,57 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.signals import bulk_loaded, recipes_changed
+from user.models import Follow
+
+from .cache import (FAVORITES_VERSION, FOLLOWS_VERSION, INGREDIENTS_VERSION,
+                    RECIPES_VERSION, SHOPPING_CART_VERSION, TAGS_VERSION,
+                    bump_version_on_commit)
+from .middleware import time_query
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(bulk_loaded, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(bulk_loaded, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version_on_commit(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(recipes_changed, sender=Recipe)
+def bump_recipes_version(sender, **kwargs):
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_favorites_version(sender, instance, **kwargs):
+    bump_version_on_commit(FAVORITES_VERSION.format(instance.user_id))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_shopping_cart_version(sender, instance, **kwargs):
+    bump_version_on_commit(SHOPPING_CART_VERSION.format(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follows_version(sender, instance, **kwargs):
+    bump_version_on_commit(FOLLOWS_VERSION.format(instance.user_id))
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # В начало списка: execute_wrapper() снимает обёртки с конца.
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
@@ -0,0 +1,71 @@
+from django.test import TestCase
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='Pa$$w0rd-123',
+        first_name='Имя',
+        last_name='Фамилия'
+    )
+
+
+def create_recipes(author, number, tags=(), ingredients=()):
+    """Рецепты с тегами tags и ингредиентами ingredients; количество
+    ингредиента равно номеру рецепта."""
+    recipes = []
+    for index in range(number):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {index}',
+            text='Описание',
+            cooking_time=index + 1,
+            image='recipes/images/recipe.png'
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=index + 1
+            )
+            for ingredient in ingredients
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class APITestCase(TestCase):
+    """Автор с рецептами, теги, ингредиенты и клиенты для запросов."""
+    recipes_number = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', color=f'#00000{index}',
+                slug=f'tag-{index}'
+            )
+            for index in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(3)
+        ]
+        cls.recipes = create_recipes(
+            cls.author, cls.recipes_number, cls.tags, cls.ingredients
+        )
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
@@ -0,0 +1,100 @@
+import asyncio
+from contextlib import contextmanager
+from unittest import mock
+
+from api.views import RecipeViewSet
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, override_settings
+from recipes.models import Favorite
+from rest_framework.authtoken.models import Token
+from rest_framework.views import exception_handler
+
+from .base import APITestCase
+
+
+CACHE_METHODS = ('get', 'set', 'add', 'incr', 'get_many', 'set_many')
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+@contextmanager
+def cache_calls_in_loop():
+    """Собирает имена методов кэша, вызванных в цикле событий."""
+    calls = []
+    backend = type(cache._connections[cache._alias])
+    patches = []
+    for name in CACHE_METHODS:
+        original = getattr(backend, name)
+
+        def method(self, *args, original=original, name=name, **kwargs):
+            if in_event_loop():
+                calls.append(name)
+            return original(self, *args, **kwargs)
+
+        patches.append(mock.patch.object(backend, name, method))
+    for patch in patches:
+        patch.start()
+    try:
+        yield calls
+    finally:
+        for patch in patches:
+            patch.stop()
+
+
+class AsyncReadTests(APITestCase):
+
+    async def test_exception_handler_runs_outside_event_loop(self):
+        loops = []
+
+        def handler(exc, context):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return exception_handler(exc, context)
+
+        view = RecipeViewSet.as_async_view({'get': 'retrieve'})
+        with mock.patch.object(
+            RecipeViewSet, 'get_exception_handler', return_value=handler
+        ):
+            response = await view(
+                AsyncRequestFactory().get('/api/recipes/0/'), pk=0
+            )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(loops, [None])
+
+    async def test_cache_outside_event_loop(self):
+        token = await Token.objects.acreate(user=self.user)
+        await Favorite.objects.acreate(user=self.user, recipe=self.recipes[0])
+        view = RecipeViewSet.as_async_view({'get': 'list'})
+        factory = AsyncRequestFactory()
+        with cache_calls_in_loop() as calls:
+            for _ in range(2):
+                # AsyncRequestFactory передаёт именованные аргументы
+                # как заголовки ASGI.
+                response = await view(factory.get(
+                    '/api/recipes/', authorization=f'Token {token.key}'
+                ))
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        # Ответ собран для пользователя, а не для анонима.
+        self.assertIn(b'"is_favorited":true', response.content)
+        self.assertEqual(calls, [])
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0)
+    async def test_middleware_cache_outside_event_loop(self):
+        token = await Token.objects.acreate(user=self.user)
+        headers = {'authorization': f'Token {token.key}'}
+        url = f'/api/recipes/{self.recipes[0].id}/favorite/'
+        with cache_calls_in_loop() as calls:
+            response = await self.async_client.post(url, **headers)
+            self.assertEqual(response.status_code, 201)
+            response = await self.async_client.get('/api/tags/', **headers)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [])
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListLine
+
+from .base import APITestCase
+
+
+class RecipeBulkViewTests(APITestCase):
+    recipes_number = 4
+
+    def setUp(self):
+        self.client = self.get_client(self.user)
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def get_counters(self, field):
+        return dict(Recipe.objects.values_list('id', field))
+
+    def get_shopping_list(self, user):
+        return dict(ShoppingListLine.objects.filter(
+            user=user
+        ).values_list('ingredient_id', 'total_amount'))
+
+    def test_add_to_shopping_cart(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.client.post(
+            '/api/shopping_cart/bulk/',
+            {'recipes': [self.ids[0], self.ids[1], 0x7fffffff, self.ids[1]]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.ids[0], 'status': 'exists'},
+            {'id': self.ids[1], 'status': 'added'},
+            {'id': 0x7fffffff, 'status': 'not_found'},
+        ])
+        counters = self.get_counters('carts_count')
+        self.assertEqual(counters[self.ids[0]], 1)
+        self.assertEqual(counters[self.ids[1]], 1)
+        self.assertEqual(counters[self.ids[2]], 0)
+        # Количества ингредиентов в рецептах 0 и 1 равны 1 и 2.
+        self.assertEqual(self.get_shopping_list(self.user), {
+            ingredient.id: 3 for ingredient in self.ingredients
+        })
+
+    def test_remove_from_shopping_cart(self):
+        for recipe in self.recipes[:3]:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        response = self.client.delete(
+            '/api/shopping_cart/bulk/',
+            {'recipes': [self.ids[0], self.ids[2], self.ids[3]]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [outcome['status'] for outcome in response.json()],
+            ['removed', 'removed', 'absent']
+        )
+        self.assertEqual(
+            list(ShoppingCart.objects.values_list('recipe_id', flat=True)),
+            [self.ids[1]]
+        )
+        self.assertEqual(self.get_counters('carts_count'), {
+            recipe_id: int(recipe_id == self.ids[1]) for recipe_id in self.ids
+        })
+        self.assertEqual(self.get_shopping_list(self.user), {
+            ingredient.id: 2 for ingredient in self.ingredients
+        })
+
+    def test_matches_single_recipe_endpoints(self):
+        other = self.get_client(self.author)
+        for recipe_id in self.ids[:3]:
+            other.post(f'/api/recipes/{recipe_id}/favorite/')
+            other.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+        other.delete(f'/api/recipes/{self.ids[1]}/favorite/')
+        other.delete(f'/api/recipes/{self.ids[1]}/shopping_cart/')
+        for url in ('/api/favorites/bulk/', '/api/shopping_cart/bulk/'):
+            self.client.post(url, {'recipes': self.ids[:3]}, format='json')
+            self.client.delete(url, {'recipes': [self.ids[1]]}, format='json')
+        self.assertEqual(
+            self.get_shopping_list(self.user),
+            self.get_shopping_list(self.author)
+        )
+        for model in (Favorite, ShoppingCart):
+            self.assertEqual(
+                set(model.objects.filter(
+                    user=self.user
+                ).values_list('recipe_id', flat=True)),
+                set(model.objects.filter(
+                    user=self.author
+                ).values_list('recipe_id', flat=True))
+            )
+        self.assertEqual(self.get_counters('favorites_count'), {
+            recipe_id: 2 * (recipe_id in (self.ids[0], self.ids[2]))
+            for recipe_id in self.ids
+        })
+
+    def test_invalid_body(self):
+        for body in (
+            {},
+            {'recipes': []},
+            {'recipes': ['рецепт']},
+            {'recipes': [0]},
+            {'recipes': list(range(1, 1000))},
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    '/api/favorites/bulk/', body, format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_anonymous(self):
+        response = self.get_client().post(
+            '/api/favorites/bulk/', {'recipes': self.ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_single_marks_lock_user(self):
+        """Одиночные отметки берут ту же блокировку, что и пачки."""
+        url = f'/api/recipes/{self.ids[0]}/shopping_cart/'
+        with mock.patch('api.utils.lock_user') as lock_user:
+            self.assertEqual(self.client.post(url).status_code, 201)
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(
+            lock_user.call_args_list,
+            [mock.call(self.user), mock.call(self.user)]
+        )
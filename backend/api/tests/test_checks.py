@@ -0,0 +1,28 @@
+from api.checks import check_shared_cache
+from django.test import SimpleTestCase, override_settings
+
+REDIS_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    'LOCATION': 'redis://redis:6379',
+}}
+LOCMEM_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    @override_settings(DEBUG=False, CACHES=LOCMEM_CACHES)
+    def test_local_cache_without_debug(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['api.W001']
+        )
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM_CACHES)
+    def test_local_cache_with_debug(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=False, CACHES=REDIS_CACHES)
+    def test_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
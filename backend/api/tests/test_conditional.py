@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import APITestCase
+
+
+class ConditionalListTests(APITestCase):
+    recipes_number = 4
+
+    def setUp(self):
+        cache.clear()
+        self.client = self.get_client()
+
+    def get(self, url, **headers):
+        # Кэш ответов сбрасывается, чтобы запрос дошёл до вьюхи.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **headers)
+        return response, [query['sql'].upper() for query in context]
+
+    def test_page_mode_counts_once(self):
+        response, queries = self.get('/api/recipes/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual(
+            sum('COUNT(' in query for query in queries), 1, queries
+        )
+        response, queries = self.get(
+            '/api/recipes/?limit=2', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1, queries)
+
+    def test_cursor_mode_skips_aggregate(self):
+        response, queries = self.get('/api/recipes/?limit=2&cursor=')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query
+             or 'MAX(' in query],
+            queries
+        )
+        etag = response['ETag']
+        response, queries = self.get(
+            '/api/recipes/?limit=2&cursor=', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1, queries)
+        self.recipes[-1].save()
+        response, _ = self.get(
+            '/api/recipes/?limit=2&cursor=', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,32 @@
+from api.management.commands.explain_hot_queries import (HOT_QUERIES,
+                                                         SEQUENTIAL_SCAN,
+                                                         VENDOR_SKIPS,
+                                                         find_full_scans,
+                                                         get_plan)
+from django.db import connection
+from django.test import TestCase
+from recipes.models import Recipe
+
+
+class HotQueryPlanTests(TestCase):
+    """Горячие запросы API читают таблицы по индексам, а не целиком."""
+
+    def test_no_full_scans(self):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            self.skipTest(f'Планы {connection.vendor} не разбираются')
+        skipped = VENDOR_SKIPS.get(connection.vendor, set())
+        for name, get_queryset in HOT_QUERIES.items():
+            if name in skipped:
+                continue
+            with self.subTest(name=name):
+                plan = get_plan(get_queryset())
+                self.assertEqual(find_full_scans(plan), [], plan)
+
+    def test_detects_full_scan(self):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            self.skipTest(f'Планы {connection.vendor} не разбираются')
+        # По тексту рецепта индекса нет: формат плана должен распознаваться.
+        plan = get_plan(Recipe.objects.filter(text='Описание'))
+        self.assertEqual(
+            find_full_scans(plan), [Recipe._meta.db_table], plan
+        )
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from api.fastpath import build_recipes
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeGetSerializer
+from api.utils import setup_eager_loading
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from recipes.models import Favorite, Recipe, ShoppingCart
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIRequestFactory
+from user.models import Follow
+
+from .base import APITestCase, create_recipes, create_user
+
+
+class FastPathTests(APITestCase):
+    """Быстрый путь списка рецептов отдаёт те же байты, что
+    RecipeGetSerializer."""
+    recipes_number = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other = create_user('other')
+        cls.recipes += create_recipes(other, 2, cls.tags[:1])
+        # Рецепт без тегов и ингредиентов, текст с символами, которые
+        # экранирует FastJSONRenderer.
+        cls.recipes += create_recipes(other, 1)
+        Recipe.objects.filter(id=cls.recipes[-1].id).update(
+            name='Пирог "Наполеон"', text='Строка\u2028строка\u2029<b>'
+        )
+        Recipe.objects.filter(id=cls.recipes[0].id).update(
+            image_variants={'thumbnail': 'recipes/variants/thumbnail.webp'}
+        )
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        for recipe in cls.recipes[1::2]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def get_request(self, user):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = user
+        return request
+
+    def render(self, recipe_ids, user):
+        recipes = setup_eager_loading(
+            Recipe.objects.filter(id__in=recipe_ids), RecipeGetSerializer
+        ).in_bulk()
+        # many=True выбрал бы RecipeListSerializer, то есть быстрый путь.
+        expected = JSONRenderer().render(ListSerializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids],
+            child=RecipeGetSerializer(),
+            context={'request': self.get_request(user)}
+        ).data)
+        actual = FastJSONRenderer().render(
+            build_recipes(recipe_ids, self.get_request(user))
+        )
+        return expected, actual
+
+    def test_same_bytes(self):
+        recipe_ids = [recipe.id for recipe in reversed(self.recipes)]
+        for user in (AnonymousUser(), self.user, self.author):
+            with self.subTest(user=user):
+                expected, actual = self.render(recipe_ids, user)
+                self.assertEqual(actual, expected)
+
+    def test_skips_deleted_recipes(self):
+        recipe_ids = [self.recipes[0].id, 999999, self.recipes[1].id]
+        data = build_recipes(recipe_ids, None)
+        self.assertEqual(
+            [recipe['id'] for recipe in data],
+            [self.recipes[0].id, self.recipes[1].id]
+        )
+
+    def test_check_fast_path_command(self):
+        stdout = StringIO()
+        call_command('check_fast_path', batch_size=3, stdout=stdout)
+        self.assertIn('Совпадают все 7 рецептов', stdout.getvalue())
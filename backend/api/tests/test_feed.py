@@ -0,0 +1,51 @@
+from unittest import mock
+
+from api.pagination import FeedPagination
+from django.core.cache import cache
+from django.test import override_settings
+from user.models import Follow
+
+from .base import APITestCase, create_recipes, create_user
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class FeedTests(APITestCase):
+    recipes_number = 0
+
+    def setUp(self):
+        cache.clear()
+        self.client = self.get_client(self.user)
+
+    def get_feed_ids(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_author_below_fanout_limit(self):
+        other = create_user('other')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        merged = create_recipes(self.author, 2)
+        self.assertEqual(
+            self.get_feed_ids(), [recipe.id for recipe in merged[::-1]]
+        )
+        # Подписчиков становится меньше порога: рецепты, которые не
+        # раздавались, остаются в ленте, а новые раздаются.
+        Follow.objects.filter(user=other).delete()
+        fanned_out = create_recipes(self.author, 1)
+        self.assertEqual(
+            self.get_feed_ids(),
+            sorted((recipe.id for recipe in fanned_out + merged),
+                   reverse=True)
+        )
+        self.assertEqual(
+            self.user.timeline.get().recipe_id, fanned_out[0].id
+        )
+
+    @mock.patch.object(FeedPagination, 'max_page_size', 2)
+    def test_limit_is_clamped(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        create_recipes(self.author, 3)
+        response = self.client.get('/api/recipes/feed/?limit=1000')
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIsNotNone(response.json()['next'])
@@ -0,0 +1,45 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from api.utils import Base64ImageField, decode_base64
+from django.test import SimpleTestCase
+from PIL import Image
+
+
+def make_png():
+    image = Image.effect_noise((64, 64), 100)
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    """Фото рецепта декодируется по частям."""
+
+    def setUp(self):
+        self.png = make_png()
+
+    def get_payload(self, encoded):
+        return 'data:image/png;base64,' + encoded
+
+    @mock.patch('api.utils.BASE64_CHUNK_SIZE', 10)
+    def test_line_wrapped_payload(self):
+        # encodebytes переносит строки через 76 символов, поэтому части
+        # по 10 символов не выровнены по четвёркам base64.
+        encoded = base64.encodebytes(self.png).decode()
+        self.assertIn('\n', encoded)
+        image = Base64ImageField().to_internal_value(
+            self.get_payload(encoded)
+        )
+        self.assertEqual(image.read(), self.png)
+        image.close()
+
+    @mock.patch('api.utils.BASE64_CHUNK_SIZE', 10)
+    def test_chunks(self):
+        for encoded in (
+            base64.b64encode(self.png).decode(),
+            base64.encodebytes(self.png).decode().replace('\n', '\r\n '),
+        ):
+            with self.subTest(encoded=encoded[:80]):
+                self.assertEqual(b''.join(decode_base64(encoded)), self.png)
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from api.pagination import IdCursorPagination, PageOrCursorPagination
+from django.core.cache import cache
+
+from .base import APITestCase
+
+
+class PageSizeTests(APITestCase):
+    recipes_number = 4
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch.object(IdCursorPagination, 'max_page_size', 2)
+    @mock.patch.object(PageOrCursorPagination, 'max_page_size', 2)
+    def test_limit_is_clamped(self):
+        client = self.get_client()
+        for url in ('/api/recipes/?limit=1000',
+                    '/api/recipes/?limit=1000&cursor='):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), 2)
+
+
+class SearchCursorTests(APITestCase):
+
+    def test_search_keeps_relevance_order(self):
+        # Слово в названии весит больше, чем в описании, поэтому первым
+        # идёт рецепт с меньшим id, хотя курсор сортирует по -id.
+        first, second = self.recipes[:2]
+        self.assertLess(first.id, second.id)
+        first.name = 'Борщ'
+        first.save()
+        second.text = 'Почти борщ'
+        second.save()
+        client = self.get_client()
+        expected = client.get('/api/recipes/?search=борщ').json()
+        self.assertEqual(
+            [recipe['id'] for recipe in expected['results']],
+            [first.id, second.id]
+        )
+        response = client.get('/api/recipes/?search=борщ&cursor=')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from recipes.models import Favorite, ShoppingCart
+from user.models import Follow
+
+from .base import APITestCase, create_recipes, create_user
+
+
+class ListQueriesTests(APITestCase):
+    """Число запросов списка не зависит от размера страницы."""
+    recipes_number = 8
+    limits = (1, 4, 8)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for index in range(7):
+            author = create_user(f'author{index}')
+            create_recipes(author, 2, cls.tags, cls.ingredients)
+            Follow.objects.create(user=cls.user, author=author)
+
+    def assert_num_queries(self, number, client, url):
+        for limit in self.limits:
+            # Кэш ответов сбрасывается, чтобы запрос дошёл до вьюхи.
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(number):
+                response = client.get(url.format(limit=limit))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), limit)
+
+    def test_recipes_anonymous(self):
+        # Агрегат для ETag, страница, рецепты с авторами, теги,
+        # ингредиенты.
+        self.assert_num_queries(
+            5, self.get_client(), '/api/recipes/?limit={limit}'
+        )
+
+    def test_recipes_authenticated(self):
+        # Плюс токен и id избранного, корзины и подписок.
+        self.assert_num_queries(
+            9, self.get_client(self.user), '/api/recipes/?limit={limit}'
+        )
+
+    def test_recipes_cursor(self):
+        # Курсорная навигация обходится без агрегата.
+        self.assert_num_queries(
+            8, self.get_client(self.user),
+            '/api/recipes/?limit={limit}&cursor='
+        )
+
+    def test_subscriptions(self):
+        # Токен, число подписок, авторы, их рецепты одним prefetch,
+        # id подписок пользователя.
+        self.assert_num_queries(
+            5, self.get_client(self.user), '/api/users/?limit={limit}'
+        )
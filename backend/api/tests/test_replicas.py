@@ -0,0 +1,139 @@
+from contextlib import ExitStack
+from unittest import mock
+
+from api import replicas
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Favorite
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .base import create_recipes, create_user
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплики - ещё два подключения к тестовой базе. Данные теста
+    фиксируются в базе и видны через любое из них."""
+    # Реплики появляются в setUpClass, после проверок и создания тестовых
+    # баз раннером, и входят в '__all__' через connections.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        for alias in REPLICAS:
+            connections.settings[alias] = {
+                **connections['default'].settings_dict,
+                'TEST': {'MIRROR': 'default'},
+            }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def setUp(self):
+        cache.clear()
+        # Проверки отставания - тоже запросы к репликам; они делаются
+        # заранее, чтобы в подсчёт попадали только чтения запроса.
+        replicas.health.checked.clear()
+        for alias in REPLICAS:
+            replicas.health.is_healthy(alias)
+        self.user = create_user('user')
+        # Варианты фото строятся после фиксации и ищут файл на диске.
+        with mock.patch('recipes.signals.schedule_image_variants'):
+            self.recipes = create_recipes(create_user('author'), 3)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token {}'.format(
+            Token.objects.create(user=self.user).key
+        ))
+
+    def get(self, client, url='/api/recipes/'):
+        """Ответ и число запросов к каждой базе."""
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in ('default', *REPLICAS)
+            }
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, {
+            alias: len(context) for alias, context in contexts.items()
+        }
+
+    def assert_primary(self, queries):
+        self.assertGreater(queries['default'], 0)
+        self.assertEqual(queries['replica1'] + queries['replica2'], 0)
+
+    def assert_one_replica(self, queries):
+        self.assertEqual(queries['default'], 0)
+        self.assertEqual(
+            sorted(queries[alias] > 0 for alias in REPLICAS), [False, True]
+        )
+
+    def test_reads_from_one_replica(self):
+        _, queries = self.get(APIClient())
+        self.assert_one_replica(queries)
+        _, queries = self.get(self.client)
+        self.assert_one_replica(queries)
+
+    def test_reads_from_primary_after_write(self):
+        recipe = self.recipes[0]
+        response = self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replicas.STICKY_COOKIE, response.cookies)
+        response, queries = self.get(self.client)
+        self.assert_primary(queries)
+        self.assertEqual(
+            [item['is_favorited'] for item in response.json()['results']],
+            [item['id'] == recipe.id for item in response.json()['results']]
+        )
+        # Клиент с тем же токеном, но без cookie, тоже читает с основной.
+        self.client.cookies.clear()
+        _, queries = self.get(self.client, '/api/recipes/?limit=5')
+        self.assert_primary(queries)
+        with override_settings(PRIMARY_STICKY_SECONDS=0):
+            self.client.delete(f'/api/recipes/{recipe.id}/favorite/')
+        self.client.cookies.clear()
+        _, queries = self.get(self.client, '/api/recipes/?limit=4')
+        self.assert_one_replica(queries)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_sticky_cookie(self):
+        client = APIClient()
+        client.cookies[replicas.STICKY_COOKIE] = '1'
+        _, queries = self.get(client)
+        self.assert_primary(queries)
+
+    def test_lagging_replicas(self):
+        replicas.health.checked.clear()
+        with mock.patch.object(
+            replicas.ReplicaHealth, 'get_lag', return_value=100.0
+        ):
+            _, queries = self.get(APIClient())
+        self.assert_primary(queries)
+
+    def test_unavailable_replica(self):
+        def get_lag(health, alias):
+            if alias == 'replica1':
+                raise OperationalError('Реплика недоступна')
+            return 0.0
+
+        replicas.health.checked.clear()
+        with mock.patch.object(replicas.ReplicaHealth, 'get_lag', get_lag):
+            for limit in range(1, 6):
+                _, queries = self.get(
+                    APIClient(), f'/api/recipes/?limit={limit}'
+                )
+                self.assertEqual(queries['default'], 0)
+                self.assertEqual(queries['replica1'], 0)
@@ -0,0 +1,52 @@
+import json
+
+from recipes.models import ShoppingCart
+
+from .base import APITestCase
+
+URL = '/api/recipes/download_shopping_cart/'
+FORMATS = ('txt', 'csv', 'json', 'pdf')
+
+
+class ShoppingListTests(APITestCase):
+    """Выгрузка списка покупок во всех форматах."""
+
+    def test_anonymous_gets_json_error(self):
+        for format in FORMATS:
+            with self.subTest(format=format):
+                response = self.get_client().get(URL, {'format': format})
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('detail', response.json())
+
+    def test_unknown_format_gets_json_error(self):
+        response = self.get_client(self.user).get(URL, {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_empty_cart(self):
+        client = self.get_client(self.user)
+        for format in FORMATS:
+            with self.subTest(format=format):
+                response = client.get(URL, {'format': format})
+                self.assertEqual(response.status_code, 200)
+                content = b''.join(response.streaming_content)
+                if format == 'json':
+                    self.assertEqual(content, b'[]')
+                elif format == 'pdf':
+                    self.assertTrue(content.startswith(b'%PDF-'))
+                    self.assertTrue(content.endswith(b'%%EOF\n'))
+                else:
+                    self.assertTrue(content)
+
+    def test_cart(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.get_client(self.user).get(URL, {'format': 'json'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)),
+            [
+                {'name': ingredient.name, 'measurement_unit': 'г',
+                 'amount': 1}
+                for ingredient in self.ingredients
+            ]
+        )
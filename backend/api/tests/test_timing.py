@@ -0,0 +1,45 @@
+import re
+import time
+from unittest import mock
+
+from api.serializers import RecipeListSerializer
+from django.core.cache import cache
+
+from .base import APITestCase
+
+DELAY = 0.05
+
+
+def get_durations(response):
+    return {
+        name: float(duration) for name, duration in re.findall(
+            r'(\w+);(?:desc="[^"]*";)?dur=([\d.]+)',
+            response['Server-Timing']
+        )
+    }
+
+
+class ServerTimingTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_serialize_phase(self):
+        to_representation = RecipeListSerializer.to_representation
+
+        def slow_to_representation(serializer, data):
+            time.sleep(DELAY)
+            return to_representation(serializer, data)
+
+        with mock.patch.object(
+            RecipeListSerializer, 'to_representation',
+            slow_to_representation
+        ):
+            response = self.get_client(self.user).get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        durations = get_durations(response)
+        self.assertEqual(
+            set(durations), {'db', 'view', 'serialize', 'render', 'total'}
+        )
+        self.assertGreaterEqual(durations['serialize'], DELAY * 1000)
+        self.assertLess(durations['view'], DELAY * 1000)
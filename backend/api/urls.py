@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
+from recipes.models import Favorite, ShoppingCart
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+from .views import (CacheStatsView, IngredientViewSet, MetricsView,
+                    RecipeBulkView, RecipeViewSet, TagViewSet,
                     UserSubscribeView, UserSubscriptionsViewSet)
 
 app_name = 'api'
@@ -17,7 +20,14 @@ namespace = 'api'
 
 urlpatterns = [
     path('users/<int:user_id>/subscribe/', UserSubscribeView.as_view()),
+    path('favorites/bulk/', RecipeBulkView.as_view(model=Favorite)),
+    path('shopping_cart/bulk/', RecipeBulkView.as_view(model=ShoppingCart)),
+    path('cache-stats/', CacheStatsView.as_view()),
+    path('metrics/', MetricsView.as_view()),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns.insert(0, path('', include('api.async_urls')))
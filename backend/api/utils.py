@@ -1,10 +1,43 @@
 import base64
+import copy
 
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
-from recipes.models import Ingredient, RecipeIngredient
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import connections, router, transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListLine)
 from rest_framework import serializers, status
 from rest_framework.response import Response
+from user.models import User
+
+from .cache import (FAVORITES_VERSION, SHOPPING_CART_VERSION,
+                    bump_version_on_commit)
+
+BASE64_CHUNK_SIZE = 64 * 1024
+# Счётчик рецепта и версия данных пользователя для отметок рецептов.
+RECIPE_MARKS = {
+    Favorite: ('favorites_count', FAVORITES_VERSION),
+    ShoppingCart: ('carts_count', SHOPPING_CART_VERSION),
+}
+
+
+def decode_base64(text):
+    """Декодирует base64 частями по BASE64_CHUNK_SIZE символов.
+    Пробелы и переводы строк (кодировщики переносят строки через 76
+    символов) отбрасываются, а неполная четвёрка символов в конце части
+    переносится в следующую, чтобы не сбить выравнивание."""
+    rest = ''
+    for start in range(0, len(text), BASE64_CHUNK_SIZE):
+        chunk = rest + ''.join(text[start:start + BASE64_CHUNK_SIZE].split())
+        end = len(chunk) - len(chunk) % 4
+        rest = chunk[end:]
+        yield base64.b64decode(chunk[:end])
+    if rest:
+        yield base64.b64decode(rest)
 
 
 class Base64ImageField(serializers.ImageField):
@@ -12,29 +45,177 @@ class Base64ImageField(serializers.ImageField):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            # Декодируем по частям во временный файл: хранилище потом
+            # переносит его на место, не копируя содержимое в память.
+            data = TemporaryUploadedFile(
+                'temp.' + ext, format.split(':')[-1], 0, None
+            )
+            for chunk in decode_base64(imgstr):
+                data.write(chunk)
+            data.size = data.tell()
+            data.seek(0)
         return super().to_internal_value(data)
 
 
-def create_ingredients(ingredients, recipe):
-    ingredient_list = []
-    for ingredient in ingredients:
-        current_ingredient = get_object_or_404(
-            Ingredient,
-            id=ingredient.get('id')
-        )
-        amount = ingredient.get('amount')
-        ingredient_list.append(
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=current_ingredient,
-                amount=amount
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии фото рецепта.
+    Пока копии не готовы, для каждой отдаётся ссылка на исходное фото."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        request = self.context.get('request')
+        variants = recipe.image_variants
+        urls = {}
+        for variant in settings.RECIPE_IMAGE_VARIANTS:
+            name = variants.get(variant)
+            url = default_storage.url(name) if name else recipe.image.url
+            urls[variant] = (
+                request.build_absolute_uri(url) if request else url
             )
+        return urls
+
+
+def get_eager_loading(serializer_class):
+    """Собирает select_related и prefetch_related для сериализатора.
+    Вложенные сериализаторы обходятся рекурсивно: связь с many=True
+    превращается в Prefetch, одиночная - в select_related. Всё, что
+    нельзя вывести из полей (например, SerializerMethodField), сериализатор
+    объявляет сам в select_related_fields и prefetch_related_fields."""
+    select_related = list(
+        getattr(serializer_class, 'select_related_fields', ())
+    )
+    prefetch_related = list(
+        getattr(serializer_class, 'prefetch_related_fields', ())
+    )
+    for field in serializer_class().fields.values():
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if (not isinstance(nested, serializers.BaseSerializer)
+                or field.source == '*'):
+            continue
+        source = field.source.replace('.', '__')
+        child_select, child_prefetch = get_eager_loading(type(nested))
+        if many:
+            queryset = nested.Meta.model._default_manager.select_related(
+                *child_select
+            ).prefetch_related(*child_prefetch)
+            prefetch_related.append(Prefetch(source, queryset=queryset))
+            continue
+        select_related.append(source)
+        select_related.extend(f'{source}__{lookup}' for lookup in child_select)
+        for lookup in child_prefetch:
+            if isinstance(lookup, Prefetch):
+                lookup = copy.copy(lookup)
+                lookup.add_prefix(source)
+            else:
+                lookup = f'{source}__{lookup}'
+            prefetch_related.append(lookup)
+    return select_related, prefetch_related
+
+
+def setup_eager_loading(queryset, serializer_class):
+    select_related, prefetch_related = get_eager_loading(serializer_class)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def get_recipes_limit(request):
+    if request is None:
+        return None
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+def limit_recipes_per_author(authors, recipes_limit):
+    """Queryset с первыми recipes_limit рецептами каждого автора.
+    Нумерация внутри автора считается оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY author_id), поэтому рецепты всех
+    авторов выбираются одним запросом."""
+    recipes = Recipe.objects.filter(author__in=authors)
+    if recipes_limit is None:
+        return recipes
+    ranked = recipes.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F('author_id'),
+            order_by=F('id').desc()
+        )
+    ).order_by().values('id', 'position')
+    sql, params = ranked.query.sql_with_params()
+    return recipes.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) AS ranked '
+        f'WHERE ranked.position <= %s',
+        (*params, recipes_limit)
+    ))
+
+
+def create_ingredients(ingredients, recipe):
+    """Ингредиенты уже найдены в RecipeCreateSerializer.validate,
+    поэтому здесь остаётся один bulk_create."""
+    ingredient_list = [
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredient['ingredient'],
+            amount=ingredient['amount']
         )
+        for ingredient in ingredients
+    ]
     RecipeIngredient.objects.bulk_create(ingredient_list)
 
 
+def update_ingredients(ingredients, recipe):
+    """Приводит ингредиенты рецепта к новому списку, затрагивая только
+    изменившиеся строки. Возвращает старые и новые количества
+    в виде {id ингредиента: количество}."""
+    current = {
+        recipe_ingredient.ingredient_id: recipe_ingredient
+        for recipe_ingredient in RecipeIngredient.objects.filter(recipe=recipe)
+    }
+    old_amounts = {
+        ingredient_id: recipe_ingredient.amount
+        for ingredient_id, recipe_ingredient in current.items()
+    }
+    new_amounts = {
+        ingredient['ingredient'].id: ingredient['amount']
+        for ingredient in ingredients
+    }
+    removed = [
+        recipe_ingredient.id
+        for ingredient_id, recipe_ingredient in current.items()
+        if ingredient_id not in new_amounts
+    ]
+    changed = []
+    for ingredient_id, amount in new_amounts.items():
+        recipe_ingredient = current.get(ingredient_id)
+        if recipe_ingredient and recipe_ingredient.amount != amount:
+            recipe_ingredient.amount = amount
+            changed.append(recipe_ingredient)
+    added = [
+        ingredient for ingredient in ingredients
+        if ingredient['ingredient'].id not in current
+    ]
+    if removed:
+        RecipeIngredient.objects.filter(id__in=removed).delete()
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+    if added:
+        create_ingredients(added, recipe)
+    return old_amounts, new_amounts
+
+
+@transaction.atomic
 def create_model_instance(request, instance, serializer_name):
+    lock_user(request.user)
     serializer = serializer_name(
         data={'user': request.user.id, 'recipe': instance.id, },
         context={'request': request}
@@ -44,7 +225,9 @@ def create_model_instance(request, instance, serializer_name):
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@transaction.atomic
 def delete_model_instance(request, model_name, instance, error_message):
+    lock_user(request.user)
     if not model_name.objects.filter(
             user=request.user,
             recipe=instance
@@ -54,4 +237,106 @@ def delete_model_instance(request, model_name, instance, error_message):
             status=status.HTTP_400_BAD_REQUEST
         )
     model_name.objects.filter(user=request.user, recipe=instance).delete()
-    return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def apply_recipe_marks(model, user, recipe_ids, delta):
+    """Делает для пачки Favorite или ShoppingCart то же, что сигналы
+    для одной записи: сдвигает счётчики рецептов, правит список покупок
+    и меняет версию данных пользователя."""
+    if not recipe_ids:
+        return
+    field, version = RECIPE_MARKS[model]
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        **{field: F(field) + delta}
+    )
+    if model is ShoppingCart:
+        if delta > 0:
+            ShoppingListLine.objects.add_recipes([user.id], recipe_ids)
+        else:
+            ShoppingListLine.objects.remove_recipes([user.id], recipe_ids)
+    bump_version_on_commit(version.format(user.id))
+
+
+def lock_user(user):
+    """Блокирует строку пользователя до конца транзакции: пачки
+    и одиночные отметки одного пользователя выполняются по очереди
+    и не читают устаревший набор уже отмеченных рецептов, иначе
+    счётчики и список покупок изменились бы дважды."""
+    list(User.objects.select_for_update().filter(pk=user.pk).values('pk'))
+
+
+def delete_rows(model, ids):
+    """Удаляет строки по первичному ключу одним DELETE без сигналов
+    и без сбора связанных объектов."""
+    if not ids:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(model._meta.pk.column)} '
+            f'IN ({", ".join(["%s"] * len(ids))})',
+            ids
+        )
+
+
+def get_outcomes(recipe_ids, found, changed, done, skipped):
+    return [
+        {
+            'id': recipe_id,
+            'status': (
+                'not_found' if recipe_id not in found
+                else done if recipe_id in changed else skipped
+            ),
+        }
+        for recipe_id in recipe_ids
+    ]
+
+
+@transaction.atomic
+def bulk_add_recipes(user, model, recipe_ids):
+    """Отмечает рецепты одним bulk_create; сигналы post_save при этом
+    не отправляются, поэтому производные данные правит
+    apply_recipe_marks."""
+    lock_user(user)
+    found = set(
+        Recipe.objects.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    existing = set(
+        model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True)
+    )
+    added = [
+        recipe_id for recipe_id in recipe_ids
+        if recipe_id in found and recipe_id not in existing
+    ]
+    model.objects.bulk_create(
+        [model(user=user, recipe_id=recipe_id) for recipe_id in added],
+        ignore_conflicts=True
+    )
+    apply_recipe_marks(model, user, added, 1)
+    return get_outcomes(recipe_ids, found, set(added), 'added', 'exists')
+
+
+@transaction.atomic
+def bulk_remove_recipes(user, model, recipe_ids):
+    """Снимает отметки одним DELETE. Обычный delete() отправил бы
+    pre_delete и post_delete для каждой строки, поэтому строки удаляются
+    без сигналов, а производные данные правит apply_recipe_marks."""
+    lock_user(user)
+    found = set(
+        Recipe.objects.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    # Блокировка не даёт параллельному удалению уменьшить счётчики дважды.
+    marks = dict(
+        model.objects.select_for_update().filter(
+            user=user, recipe_id__in=found
+        ).values_list('id', 'recipe_id')
+    )
+    delete_rows(model, list(marks))
+    removed = set(marks.values())
+    apply_recipe_marks(model, user, list(removed), -1)
+    return get_outcomes(recipe_ids, found, removed, 'removed', 'absent')
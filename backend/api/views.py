@@ -1,28 +1,49 @@
-from django.db.models import Sum
-from django.shortcuts import HttpResponse, get_object_or_404
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListLine, Tag)
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from user.models import Follow, User
 
-from .filters import IngredientFilter, RecipeFilter
+from .autocomplete import ingredient_index
+from .cache import (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION,
+                    get_cache_stats)
+from .filters import RecipeFilter
+from .metrics import CONTENT_TYPE, render_metrics
+from .mixins import (AsyncReadMixin, CachedResponseMixin,
+                     ConditionalGetMixin, EagerLoadingMixin,
+                     SerializeTimingMixin)
+from .pagination import FeedPagination, PageOrCursorPagination
 from .permissions import IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .renderers import (SHOPPING_LIST_RENDERERS, FastJSONRenderer,
+                        ShoppingListRenderer)
+from .search import RecipeSearchFilter
 from .serializers import (FavoriteSerializer, IngredientSerializer,
                           RecipeCreateSerializer, RecipeGetSerializer,
+                          RecipeIdsSerializer, RecipeSmallSerializer,
                           ShoppingCartSerializer, TagSerializer,
                           UserSubscribeRepresentSerializer,
                           UserSubscribeSerializer)
-from .utils import create_model_instance, delete_model_instance
+from .utils import (bulk_add_recipes, bulk_remove_recipes,
+                    create_model_instance, delete_model_instance)
 
 
 class UserSubscribeView(APIView):
     """Создание/удаление подписки на пользователя."""
 
+    @transaction.atomic
     def post(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
         serializer = UserSubscribeSerializer(
@@ -33,6 +54,7 @@ class UserSubscribeView(APIView):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
         if not Follow.objects.filter(
@@ -47,50 +69,110 @@ class UserSubscribeView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserSubscriptionsViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class UserSubscriptionsViewSet(SerializeTimingMixin, EagerLoadingMixin,
+                               mixins.ListModelMixin,
+                               viewsets.GenericViewSet):
     """Получение списка всех подписок на пользователей."""
+    queryset = User.objects.all()
     serializer_class = UserSubscribeRepresentSerializer
+    pagination_class = PageOrCursorPagination
+    cursor_ordering = 'id'
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return super().get_queryset().filter(
+            following__user=self.request.user
+        ).order_by('id')
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(SerializeTimingMixin, CachedResponseMixin, AsyncReadMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Вьюсет для отображения тегов."""
 
+    cache_version_key = TAGS_VERSION
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(SerializeTimingMixin, CachedResponseMixin,
+                        AsyncReadMixin, viewsets.ReadOnlyModelViewSet):
     """Получение информации об ингредиентах."""
+    cache_version_key = INGREDIENTS_VERSION
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(request, partial(self.search, request))
+
+    async def alist(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return await super().alist(request, *args, **kwargs)
+        return await self.acached_response(
+            request, sync_to_async(partial(self.search, request))
+        )
+
+    def search(self, request):
+        name = request.query_params['name']
+        limit = request.query_params.get('limit', '')
+        if limit.isdigit():
+            return Response(ingredient_index.search(name, int(limit)))
+        return Response(ingredient_index.search(name))
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(SerializeTimingMixin, CachedResponseMixin,
+                    ConditionalGetMixin, EagerLoadingMixin, AsyncReadMixin,
+                    viewsets.ModelViewSet):
     """Создание/изменение/удаление рецепта.
     Получение информации о рецептах.
     """
+    cache_version_key = RECIPES_VERSION
+    cache_per_user = True
+    cached_actions = ('list',)
     queryset = Recipe.objects.all()
     permission_classes = (IsAdminAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = PageOrCursorPagination
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_queryset(self):
+        if self.action in ('list', 'feed'):
+            # Страницу собирает RecipeListSerializer по id рецептов,
+            # поэтому связи не подгружаются и остальные поля не читаются.
+            return Recipe.objects.only('id')
+        return super().get_queryset()
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
+    def get_cache_timeout(self):
+        return settings.RECIPE_PAGE_CACHE_TIMEOUT
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Ошибки списка покупок (401, 404 на неизвестный format)
+        # отдаются в JSON, а не под типом pdf или csv.
+        if (getattr(response, 'exception', False)
+                and issubclass(self.renderer_classes[0],
+                               ShoppingListRenderer)):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_eager_loading_serializer_class(self):
+        if self.action in ('favorite', 'shopping_cart'):
+            return RecipeSmallSerializer
+        return super().get_eager_loading_serializer_class()
+
     def addition(self, request, pk, model, modelserializer):
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = get_object_or_404(self.get_queryset(), id=pk)
         if request.method == 'POST':
             return create_model_instance(request, recipe, modelserializer)
         if request.method == 'DELETE':
@@ -116,22 +198,77 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated, ]
+        permission_classes=[IsAuthenticated, ],
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь, от новых
+        к старым."""
+        recipes = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated, ],
+        renderer_classes=SHOPPING_LIST_RENDERERS
     )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__carts__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        shopping_list = ['Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} - {amount}, {unit}')
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        """Список покупок в формате txt, csv, json или pdf (?format=).
+        Строки читаются из базы итератором и сразу уходят клиенту."""
+        ingredients = ShoppingListLine.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=renderer.content_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="shopping_cart.{renderer.format}"'
         )
-        return response
\ No newline at end of file
+        return response
+
+
+class RecipeBulkView(APIView):
+    """Добавление (POST) и удаление (DELETE) сразу нескольких рецептов
+    в избранном или списке покупок: {"recipes": [id, ...]}. Ответ -
+    итог по каждому id: added, exists, removed, absent или not_found."""
+    permission_classes = (IsAuthenticated,)
+    model = None
+
+    def get_recipe_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def post(self, request):
+        return Response(bulk_add_recipes(
+            request.user, self.model, self.get_recipe_ids(request)
+        ))
+
+    def delete(self, request):
+        return Response(bulk_remove_recipes(
+            request.user, self.model, self.get_recipe_ids(request)
+        ))
+
+
+class CacheStatsView(APIView):
+    """Попадания и промахи кэша ответов - для подбора его размера."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_cache_stats(('tags', 'ingredients', 'recipes')))
+
+
+class MetricsView(APIView):
+    """Гистограммы времени ответа по маршрутам в формате Prometheus."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
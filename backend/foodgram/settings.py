@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,6 +96,39 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: хосты PostgreSQL (или файлы SQLite) через
+# пробел. В тестах две копии файла SQLite можно подключить как реплики
+# с 'TEST': {'MIRROR': 'default'}, тогда они читают тестовую базу.
+DATABASE_REPLICAS = []
+for number, location in enumerate(os.getenv('DB_REPLICAS', '').split(), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if 'sqlite3' in DATABASES['default']['ENGINE'] else 'HOST':
+            location,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд после изменения клиент читает с основной базы.
+PRIMARY_STICKY_SECONDS = int(os.getenv('PRIMARY_STICKY_SECONDS', 10))
+# Реплика, отстающая больше стольких секунд, не используется.
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = 5
+
+# Версии каталога и прочие счётчики инвалидации хранятся в кэше, поэтому
+# при нескольких воркерах нужен общий бэкенд: docker-compose задаёт Redis,
+# а с LocMemCache без DEBUG проверка api.W001 выдаёт предупреждение.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -187,6 +222,16 @@ INGREDIENT_MIN_AMOUNT_ERROR = (
     'Количество ингредиентов не может быть меньше {min_value}!'
 )
 QUERY_SET_LENGTH = 60
+INGREDIENT_SEARCH_LIMIT = 50
+# Срок хранения готовых ответов справочников (теги, ингредиенты) и страниц
+# списка рецептов. Ответы сбрасываются сменой версий, а срок лишь
+# освобождает память от старых версий.
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_PAGE_CACHE_TIMEOUT = 60 * 30
+# Сколько рецептов можно добавить или удалить одним запросом.
+BULK_RECIPES_LIMIT = 100
+# Наибольшее значение параметра limit в списках с пагинацией.
+MAX_PAGE_SIZE = 100
 INCORRECT_LAYOUT = str.maketrans(
     'qwertyuiop[]asdfghjkl;\'zxcvbnm,./',
     'йцукенгшщзхъфывапролджэячсмитьбю.'
@@ -201,6 +246,33 @@ COLOR_PALETTE = [
     ("#800080", 'Фиолетовый'),
     ("#FFFF00", 'Желтый'),
 ]
+# Размеры уменьшенных копий фото рецепта и число потоков для их обработки.
+# При RECIPE_IMAGE_WORKERS = 0 копии строятся синхронно.
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+# Лента подписок: рецепты авторов, у которых подписчиков меньше
+# FEED_FANOUT_LIMIT, раздаются в ленты при публикации пачками по
+# FEED_BATCH_SIZE; остальные подмешиваются при чтении. При подписке в ленту
+# добавляются FEED_BACKFILL_LIMIT последних рецептов автора.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 10000))
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_LIMIT = 100
+# Как часто (в секундах) воркер переносит накопленные метрики в кэш.
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 10))
+# Асинхронное чтение тегов, ингредиентов и рецептов (api/async_urls.py).
+# Включается при запуске под ASGI: под WSGI каждая асинхронная вьюха
+# получила бы свой цикл событий. Замер bench_concurrency на одном ядре
+# с SQLite (gunicorn с 8 потоками против одного воркера uvicorn):
+# с токеном 234-254 запроса/с под WSGI против 137-155 под ASGI, без токена
+# 488-540 против 229-242. Чтения на SQLite всё равно уходят в потоки
+# sync_to_async, поэтому выигрыш ASGI стоит ждать только при медленной
+# сети до базы и многих одновременных клиентах; перед включением
+# повторите замер на своей базе.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
 MODEL_NAME = 200
 MODEL_FACT = 1
 DJANGO_SUPERUSER_PASSWORD = '1a2b3c4dAidar'
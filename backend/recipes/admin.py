@@ -1,19 +1,84 @@
 from django.contrib import admin
+from django.db.models import Count
 
-from recipes.models import Recipe, IngredientInRecipe, Favorite, ShoppingCart
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListLine, Tag)
 
-admin.site.register(IngredientInRecipe)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+
+class BigTableAdmin(admin.ModelAdmin):
+    """Общие настройки для больших таблиц: без второго COUNT(*) по всей
+    таблице. Поиск в наследниках - по началу строки (__startswith),
+    чтобы работали индексы."""
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    """Админка тегов."""
+    list_display = ('name', 'slug', 'color', 'recipes_count')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count('recipe')
+        )
+
+    @admin.display(description='Рецептов', ordering='recipes_count')
+    def recipes_count(self, obj):
+        return obj.recipes_count
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(BigTableAdmin):
+    """Админка ингредиентов."""
+    list_display = ('name', 'measurement_unit')
+    search_fields = ('name__startswith',)
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+    min_num = 1
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BigTableAdmin):
     """Модель рецептов в админке"""
     list_display = ('name', 'author', 'in_favorite')
-    list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name__startswith', 'author__username__startswith')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('tags',)
+    inlines = (RecipeIngredientInline,)
 
+    def save_formset(self, request, form, formset, change):
+        """Правка ингредиентов переносится в списки покупок, как при
+        изменении рецепта через API."""
+        if formset.model is not RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        recipe_id = form.instance.id
+        old_amounts = ShoppingListLine.objects.get_recipe_amounts(recipe_id)
+        super().save_formset(request, form, formset, change)
+        ShoppingListLine.objects.change_recipe(
+            recipe_id,
+            old_amounts,
+            ShoppingListLine.objects.get_recipe_amounts(recipe_id)
+        )
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorite(self, obj):
         """Показывает сколько раз рецепт был добавлен в избранное"""
-        count = obj.in_favorite.all().count()
-        return count
+        return obj.favorites_count
+
+
+@admin.register(Favorite, ShoppingCart)
+class UserRecipeAdmin(BigTableAdmin):
+    """Админка избранного и списков покупок."""
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    search_fields = ('user__username__startswith', 'recipe__name__startswith')
+    raw_id_fields = ('user', 'recipe')
@@ -0,0 +1,94 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.RECIPE_IMAGE_WORKERS, 1),
+    thread_name_prefix='recipe-images'
+)
+
+
+def get_image_format():
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail(size)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    buffer = BytesIO()
+    # exif и прочие метаданные не передаются, поэтому в вариант не попадают.
+    variant.save(buffer, image_format, quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def build_image_variants(recipe_id, image_name):
+    """Строит уменьшенные копии фото рецепта и сохраняет их пути
+    в Recipe.image_variants. Выполняется в пуле потоков."""
+    from .models import Recipe
+    from .signals import recipes_changed
+
+    try:
+        image_format, extension = get_image_format()
+        stem = PurePosixPath(image_name).stem
+        variants = {'source': image_name}
+        with default_storage.open(image_name) as file:
+            with Image.open(file) as image:
+                image = ImageOps.exif_transpose(image)
+                for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+                    variants[variant] = default_storage.save(
+                        f'recipes/variants/{stem}_{variant}.{extension}',
+                        ContentFile(render_variant(image, size, image_format))
+                    )
+        old_variants = Recipe.objects.filter(
+            id=recipe_id
+        ).values_list('image_variants', flat=True).first() or {}
+        updated = Recipe.objects.filter(
+            id=recipe_id, image=image_name
+        ).update(image_variants=variants, updated_at=timezone.now())
+        # Если фото успели заменить или рецепт удалён, свежие варианты
+        # не нужны; иначе удаляются варианты предыдущего фото.
+        if updated:
+            recipes_changed.send(sender=Recipe)
+            stale = set(old_variants.values()) - set(variants.values())
+        else:
+            stale = set(variants.values())
+        for name in stale - {image_name, old_variants.get('source')}:
+            default_storage.delete(name)
+    except Exception:
+        logger.exception('Не удалось обработать фото рецепта %s', recipe_id)
+
+
+def build_image_variants_in_worker(recipe_id, image_name):
+    # У потока пула своё соединение с базой; закрываем его после задачи.
+    try:
+        build_image_variants(recipe_id, image_name)
+    finally:
+        connection.close()
+
+
+def schedule_image_variants(recipe):
+    """Ставит обработку фото в очередь после фиксации транзакции.
+    При RECIPE_IMAGE_WORKERS = 0 обработка идёт сразу, в том же потоке."""
+    if not recipe.image:
+        return
+    if recipe.image_variants.get('source') == recipe.image.name:
+        return
+    args = (recipe.id, recipe.image.name)
+    if settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: executor.submit(build_image_variants_in_worker, *args)
+        )
+    else:
+        transaction.on_commit(lambda: build_image_variants(*args))
@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.signals import bulk_loaded
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def skip_separators(buffer, position):
+    while position < len(buffer) and buffer[position] in ' \t\r\n,':
+        position += 1
+    return position
+
+
+def iter_json_array(file):
+    """Потоково разбирает JSON-массив объектов, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив')
+    position = 1
+    while True:
+        position = skip_separators(buffer, position)
+        if buffer[position:position + 1] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON обрывается')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def iter_json_lines(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+class CSVStream(io.TextIOBase):
+    """Файлоподобный объект для COPY: отдаёт строки итератора в виде CSV
+    и вызывает on_row для подсчёта прогресса."""
+
+    def __init__(self, rows, on_row):
+        self.rows = iter(rows)
+        self.on_row = on_row
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or self.buffer.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.on_row()
+        data = self.buffer.getvalue()
+        if size < 0 or len(data) <= size:
+            result, rest = data, ''
+        else:
+            result, rest = data[:size], data[size:]
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffer.write(rest)
+        return result
+
+
+class BulkLoadCommand(BaseCommand):
+    """Общая часть команд загрузки справочников из CSV/JSON.
+    Наследник задаёт model и fields; строки с уже существующими значениями
+    уникальных полей пропускаются. На PostgreSQL данные идут через COPY
+    во временную таблицу и INSERT ... ON CONFLICT DO NOTHING, на остальных
+    базах - пачками bulk_create(ignore_conflicts=True)."""
+    model = None
+    fields = ()
+    progress_every = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу CSV, JSON или JSONL.')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json', 'jsonl'),
+            help='Формат файла; по умолчанию - по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки bulk_create.'
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.'
+        )
+
+    def read_rows(self, file, file_format):
+        if file_format == 'csv':
+            for row in csv.reader(file):
+                if row and [value.strip() for value in row] != list(
+                    self.fields
+                ):
+                    yield row
+            return
+        items = (
+            iter_json_array(file) if file_format == 'json'
+            else iter_json_lines(file)
+        )
+        for item in items:
+            yield [item.get(field, '') for field in self.fields]
+
+    def clean_rows(self, rows):
+        max_lengths = [
+            self.model._meta.get_field(field).max_length
+            for field in self.fields
+        ]
+        for row in rows:
+            row = [str(value).strip() for value in row[:len(self.fields)]]
+            if len(row) != len(self.fields) or not all(row):
+                self.skipped += 1
+                continue
+            if any(
+                max_length and len(value) > max_length
+                for value, max_length in zip(row, max_lengths)
+            ):
+                self.skipped += 1
+                continue
+            yield row
+
+    def count_row(self):
+        self.processed += 1
+        if self.processed % self.progress_every == 0:
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Обработано {self.processed} строк, {rate:.0f} строк/с'
+        )
+
+    def load_with_bulk_create(self, rows, batch_size):
+        while True:
+            batch = {}
+            for row in islice(rows, batch_size):
+                self.count_row()
+                batch.setdefault(tuple(row), None)
+            if not batch:
+                return
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.fields, row))) for row in batch],
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+
+    def load_with_copy(self, rows):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(
+                self.model._meta.get_field(field).column
+            )
+            for field in self.fields
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE bulk_load_staging '
+                f'ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY bulk_load_staging ({columns}) FROM STDIN '
+                'WITH (FORMAT csv)',
+                CSVStream(rows, self.count_row)
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM bulk_load_staging '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json', 'jsonl'):
+            raise CommandError('Укажите формат через --format')
+        self.processed = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        before = self.model.objects.count()
+        with open(path, encoding='utf-8-sig', newline='') as file:
+            rows = self.clean_rows(self.read_rows(file, file_format))
+            with transaction.atomic():
+                if use_copy:
+                    self.load_with_copy(rows)
+                else:
+                    self.load_with_bulk_create(rows, options['batch_size'])
+        bulk_loaded.send(sender=self.model)
+        self.report()
+        created = self.model.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {created}, уже были: '
+            f'{self.processed - created}, пропущено: {self.skipped}'
+        ))
@@ -0,0 +1,9 @@
+from recipes.models import Ingredient
+
+from ._loader import BulkLoadCommand
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает ингредиенты из CSV (name,measurement_unit) или JSON.'
+    model = Ingredient
+    fields = ('name', 'measurement_unit')
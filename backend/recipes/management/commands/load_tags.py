@@ -0,0 +1,9 @@
+from recipes.models import Tag
+
+from ._loader import BulkLoadCommand
+
+
+class Command(BulkLoadCommand):
+    help = 'Загружает теги из CSV (name,color,slug) или JSON.'
+    model = Tag
+    fields = ('name', 'color', 'slug')
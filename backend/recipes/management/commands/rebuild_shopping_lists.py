@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingCart, ShoppingListLine
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет агрегированные списки покупок с корзинами '
+        'и пересобирает расходящиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить, ничего не изменяя.'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='id пользователя; можно указать несколько раз.'
+        )
+
+    def get_user_ids(self, users):
+        if users:
+            return sorted(users)
+        user_ids = set(
+            ShoppingCart.objects.values_list('user_id', flat=True)
+        )
+        user_ids.update(
+            ShoppingListLine.objects.values_list('user_id', flat=True)
+        )
+        return sorted(user_ids)
+
+    def get_broken_user_ids(self, user_ids):
+        live = ShoppingListLine.objects.get_live_totals(user_ids)
+        stored = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingListLine.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'ingredient_id', 'total_amount')
+        }
+        return {
+            user_id
+            for (user_id, _), _ in live.items() ^ stored.items()
+        }
+
+    def handle(self, *args, **options):
+        user_ids = self.get_user_ids(options['users'])
+        broken = 0
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            with transaction.atomic():
+                broken_ids = self.get_broken_user_ids(batch)
+                if broken_ids and not options['verify']:
+                    ShoppingListLine.objects.rebuild(broken_ids)
+            broken += len(broken_ids)
+            for user_id in sorted(broken_ids):
+                self.stdout.write(f'Расхождение у пользователя {user_id}')
+        self.stdout.write(
+            f'Проверено пользователей: {len(user_ids)}, '
+            f'с расхождениями: {broken}'
+        )
+        if broken and options['verify']:
+            raise CommandError('Списки покупок расходятся с корзинами')
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, Recipe, ShoppingCart
+from user.models import Follow, User
+
+BATCH_SIZE = 500
+
+# Модель со счётчиком, поле счётчика, считаемая модель, её внешний ключ.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by(
+            ).values(field).annotate(total=Count('pk')).values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счётчики рецептов и пользователей '
+        'с данными и исправляет расходящиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить, ничего не изменяя.'
+        )
+
+    def reconcile(self, model, counter, counted_model, field, verify):
+        actual = count_subquery(counted_model, field)
+        drifted_ids = list(
+            model.objects.annotate(actual=actual).exclude(
+                **{counter: F('actual')}
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        if not verify:
+            for start in range(0, len(drifted_ids), BATCH_SIZE):
+                with transaction.atomic():
+                    model.objects.filter(
+                        pk__in=drifted_ids[start:start + BATCH_SIZE]
+                    ).update(**{counter: actual})
+        return len(drifted_ids)
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for model, counter, counted_model, field in COUNTERS:
+            count = self.reconcile(
+                model, counter, counted_model, field, options['verify']
+            )
+            drifted += count
+            self.stdout.write(
+                f'{model._meta.object_name}.{counter}: '
+                f'расхождений {count}'
+            )
+        if drifted and options['verify']:
+            raise CommandError('Счётчики расходятся с данными')
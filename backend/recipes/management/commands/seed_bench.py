@@ -0,0 +1,263 @@
+import random
+import time
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag, TimelineEntry)
+from recipes.search import rebuild_search_index
+from recipes.signals import bulk_loaded, recipes_changed
+from user.models import Follow, User
+
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+DISHES = (
+    'суп', 'салат', 'пирог', 'рагу', 'омлет', 'плов', 'запеканка', 'каша',
+    'паста', 'котлеты', 'блины', 'оладьи', 'соус', 'десерт', 'хлеб',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'летний', 'острый', 'постный', 'праздничный',
+    'сытный', 'лёгкий', 'бабушкин', 'деревенский', 'пряный', 'нежный',
+)
+WORDS = (
+    'нарезать', 'обжарить', 'смешать', 'варить', 'запекать', 'посолить',
+    'добавить', 'остудить', 'подавать', 'минут', 'духовке', 'сковороде',
+    'кастрюле', 'огне', 'тесто', 'начинку', 'зелень', 'горячим',
+)
+
+
+class SkewedChoice:
+    """Выбор с распределением Ципфа: элемент ранга r выпадает с весом
+    1 / r ** skew. Ранги перемешаны, чтобы популярность не совпадала
+    с порядком id."""
+
+    def __init__(self, rng, population, skew):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(self.population) + 1)
+        ))
+
+    def one(self):
+        position = bisect_left(
+            self.cum_weights, self.rng.random() * self.cum_weights[-1]
+        )
+        return self.population[min(position, len(self.population) - 1)]
+
+    def distinct(self, count, exclude=None):
+        count = min(count, len(self.population) - (exclude is not None))
+        chosen = set()
+        for _ in range(count * 4):
+            if len(chosen) >= count:
+                break
+            item = self.one()
+            if item != exclude:
+                chosen.add(item)
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'подписками, избранным и корзинами с перекосом популярности, '
+        'как в живых данных. Повторный запуск добавляет новый набор.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Число пользователей.'),
+            ('recipes', 5000, 'Число рецептов.'),
+            ('ingredients', 2000, 'Число ингредиентов.'),
+            ('tags', 12, 'Число тегов.'),
+            ('follows', 20, 'Среднее число подписок пользователя.'),
+            ('favorites', 30, 'Среднее число рецептов в избранном.'),
+            ('carts', 5, 'Среднее число рецептов в корзине.'),
+            ('batch-size', 2000, 'Размер пачки bulk_create.'),
+            ('seed', 0, 'Зерно генератора случайных чисел.'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности.'
+        )
+        parser.add_argument(
+            '--password',
+            default='bench-password',
+            help='Пароль всех созданных пользователей.'
+        )
+
+    def bulk_insert(self, model, objects):
+        objects = iter(objects)
+        created = []
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            created.extend(model.objects.bulk_create(batch))
+        self.stdout.write(f'{model._meta.object_name}: {len(created)}')
+        return created
+
+    def create_catalog(self, options):
+        palette = [color for color, _ in settings.COLOR_PALETTE]
+        tags = self.bulk_insert(Tag, (
+            Tag(
+                name=f'{self.prefix} тег {number}',
+                slug=f'{self.prefix}-{number}',
+                color=palette[number % len(palette)]
+            )
+            for number in range(options['tags'])
+        ))
+        ingredients = self.bulk_insert(Ingredient, (
+            Ingredient(
+                name=f'{self.prefix} ингредиент {number}',
+                measurement_unit=self.rng.choice(UNITS)
+            )
+            for number in range(options['ingredients'])
+        ))
+        return [tag.id for tag in tags], [item.id for item in ingredients]
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        users = self.bulk_insert(User, (
+            User(
+                username=f'{self.prefix}_{number}',
+                email=f'{self.prefix}_{number}@bench.local',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password
+            )
+            for number in range(options['users'])
+        ))
+        return [user.id for user in users]
+
+    def make_recipe(self, author_id):
+        rng = self.rng
+        return Recipe(
+            author_id=author_id,
+            name=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}'.capitalize(),
+            text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+            cooking_time=rng.randint(5, 180)
+        )
+
+    def create_recipes(self, options, authors, tag_ids, ingredient_ids):
+        recipes = self.bulk_insert(Recipe, (
+            self.make_recipe(authors.one())
+            for _ in range(options['recipes'])
+        ))
+        ingredients = SkewedChoice(self.rng, ingredient_ids, options['skew'])
+        self.bulk_insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient_id in ingredients.distinct(self.rng.randint(3, 12))
+        ))
+        self.bulk_insert(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in self.rng.sample(
+                tag_ids, min(len(tag_ids), self.rng.randint(1, 3))
+            )
+        ))
+        recipes_by_author = {}
+        for recipe in recipes:
+            recipes_by_author.setdefault(recipe.author_id, []).append(
+                recipe.id
+            )
+        return [recipe.id for recipe in recipes], recipes_by_author
+
+    def pick_per_user(self, user_ids, choice, mean, exclude_self=False):
+        for user_id in user_ids:
+            count = int(self.rng.expovariate(1 / mean)) if mean else 0
+            exclude = user_id if exclude_self else None
+            for item in choice.distinct(count, exclude=exclude):
+                yield user_id, item
+
+    def create_relations(self, options, user_ids, recipe_ids, authors):
+        follows = self.bulk_insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.pick_per_user(
+                user_ids, authors, options['follows'], exclude_self=True
+            )
+        ))
+        recipes = SkewedChoice(self.rng, recipe_ids, options['skew'])
+        self.bulk_insert(Favorite, (
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.pick_per_user(
+                user_ids, recipes, options['favorites']
+            )
+        ))
+        self.bulk_insert(ShoppingCart, (
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.pick_per_user(
+                user_ids, recipes, options['carts']
+            )
+        ))
+        return follows
+
+    def create_timelines(self, follows, recipes_by_author):
+        """Ленты заполняются так же, как их заполнила бы подписка."""
+        followers = Counter(follow.author_id for follow in follows)
+        self.bulk_insert(TimelineEntry, (
+            TimelineEntry(
+                user_id=follow.user_id,
+                recipe_id=recipe_id,
+                author_id=follow.author_id
+            )
+            for follow in follows
+            if followers[follow.author_id] < settings.FEED_FANOUT_LIMIT
+            for recipe_id in sorted(
+                recipes_by_author.get(follow.author_id, ()), reverse=True
+            )[:settings.FEED_BACKFILL_LIMIT]
+        ))
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                'Нужна база, которая возвращает id из bulk_create'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'bench{time.time_ns() // 10 ** 6:x}'
+        started = time.monotonic()
+        with transaction.atomic():
+            tag_ids, ingredient_ids = self.create_catalog(options)
+            user_ids = self.create_users(options)
+            # Рецепты пишет примерно каждый пятый пользователь.
+            authors = SkewedChoice(
+                self.rng,
+                self.rng.sample(user_ids, max(1, len(user_ids) // 5)),
+                options['skew']
+            )
+            recipe_ids, recipes_by_author = self.create_recipes(
+                options, authors, tag_ids, ingredient_ids
+            )
+            follows = self.create_relations(
+                options, user_ids, recipe_ids, authors
+            )
+            self.create_timelines(follows, recipes_by_author)
+        # bulk_create обходит сигналы: производные данные пересчитываются
+        # теми же средствами, что чинят их расхождения.
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        rebuild_search_index(DEFAULT_DB_ALIAS)
+        for model in (Tag, Ingredient):
+            bulk_loaded.send(sender=model)
+        recipes_changed.send(sender=Recipe)
+        self.stdout.write(self.style.SUCCESS(
+            f'Набор {self.prefix} создан за '
+            f'{time.monotonic() - started:.1f} с; пароль пользователей: '
+            f'{options["password"]}'
+        ))
@@ -1,4 +1,4 @@
-# Generated by Django 4.1.7 on 2023-03-28 12:04
+# Generated by Django 4.1.7 on 2026-10-18 03:56
 
 from django.conf import settings
 from django.db import migrations, models
@@ -10,94 +10,103 @@ class Migration(migrations.Migration):
     initial = True
 
     dependencies = [
-        ("recipes", "0001_initial"),
         migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-        ("core", "0001_initial"),
+        ('recipes', '0001_initial'),
     ]
 
     operations = [
         migrations.AddField(
-            model_name="shoppingcart",
-            name="user",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="shopping_cart",
-                to=settings.AUTH_USER_MODEL,
-            ),
+            model_name='timelineentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
         ),
         migrations.AddField(
-            model_name="recipe",
-            name="author",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="recipes",
-                to=settings.AUTH_USER_MODEL,
-            ),
+            model_name='timelineentry',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='Рецепт'),
         ),
         migrations.AddField(
-            model_name="recipe",
-            name="ingredients",
-            field=models.ManyToManyField(
-                through="recipes.IngredientInRecipe", to="core.ingredient"
-            ),
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик'),
         ),
         migrations.AddField(
-            model_name="recipe",
-            name="tags",
-            field=models.ManyToManyField(related_name="recipes", to="core.tag"),
+            model_name='shoppinglistline',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_lines', to='recipes.ingredient', verbose_name='Ингредиент'),
         ),
         migrations.AddField(
-            model_name="ingredientinrecipe",
-            name="ingredient",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="recipes_with_ingredient",
-                to="core.ingredient",
-            ),
+            model_name='shoppinglistline',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
         ),
         migrations.AddField(
-            model_name="ingredientinrecipe",
-            name="recipe",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="ingredients_in_recipes",
-                to="recipes.recipe",
-            ),
+            model_name='shoppingcart',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='carts', to='recipes.recipe', verbose_name='Рецепты в списке покупок'),
         ),
         migrations.AddField(
-            model_name="favorite",
-            name="recipe",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="in_favorite",
-                to="recipes.recipe",
-            ),
+            model_name='shoppingcart',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='carts', to=settings.AUTH_USER_MODEL, verbose_name='Владелец вписка покупок'),
         ),
         migrations.AddField(
-            model_name="favorite",
-            name="user",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="favorite",
-                to=settings.AUTH_USER_MODEL,
-            ),
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipeingredients', to='recipes.ingredient', verbose_name='Связанные ингредиенты'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipeingredients', to='recipes.recipe', verbose_name='В каких рецептах'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='recipes.RecipeIngredient', to='recipes.ingredient', verbose_name='Ингредиенты'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags',
+            field=models.ManyToManyField(to='recipes.tag', verbose_name='Теги'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='recipes.recipe', verbose_name='Понравившиеся рецепты'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
         ),
         migrations.AddConstraint(
-            model_name="shoppingcart",
-            constraint=models.UniqueConstraint(
-                fields=("user", "recipe"), name="unique_shopping_cart"
-            ),
+            model_name='shoppinglistline',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_line'),
         ),
         migrations.AddConstraint(
-            model_name="ingredientinrecipe",
-            constraint=models.UniqueConstraint(
-                fields=("recipe", "ingredient"), name="unique_ingredient_in_recipe"
-            ),
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_cart_user'),
         ),
         migrations.AddConstraint(
-            model_name="favorite",
-            constraint=models.UniqueConstraint(
-                fields=("user", "recipe"), name="unique_favorite"
-            ),
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite_recipe'),
         ),
     ]
@@ -1,143 +0,0 @@
-# Generated by Django 4.1.7 on 2023-03-29 14:39
-
-from django.conf import settings
-import django.core.validators
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ("core", "0002_alter_ingredient_measurement_unit_and_more"),
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-        ("recipes", "0002_initial"),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name="favorite",
-            name="recipe",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="in_favorite",
-                to="recipes.recipe",
-                verbose_name="рецепт",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="favorite",
-            name="user",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="favorite",
-                to=settings.AUTH_USER_MODEL,
-                verbose_name="пользователь",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="ingredientinrecipe",
-            name="amount",
-            field=models.PositiveIntegerField(
-                validators=[django.core.validators.MinValueValidator(1)],
-                verbose_name="количество",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="ingredientinrecipe",
-            name="ingredient",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="recipes_with_ingredient",
-                to="core.ingredient",
-                verbose_name="ингредиент",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="ingredientinrecipe",
-            name="recipe",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="ingredients_in_recipes",
-                to="recipes.recipe",
-                verbose_name="рецепт",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="author",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="recipes",
-                to=settings.AUTH_USER_MODEL,
-                verbose_name="автор",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="cooking_time",
-            field=models.PositiveIntegerField(
-                validators=[django.core.validators.MinValueValidator(1)],
-                verbose_name="время приготовления",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="image",
-            field=models.ImageField(
-                upload_to="core/images/", verbose_name="изображение"
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="ingredients",
-            field=models.ManyToManyField(
-                through="recipes.IngredientInRecipe",
-                to="core.ingredient",
-                verbose_name="ингредиенты",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="name",
-            field=models.CharField(max_length=200, verbose_name="название"),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="pub_date",
-            field=models.DateTimeField(
-                auto_now_add=True, db_index=True, verbose_name="дата публикации"
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="tags",
-            field=models.ManyToManyField(
-                related_name="recipes", to="core.tag", verbose_name="теги"
-            ),
-        ),
-        migrations.AlterField(
-            model_name="recipe",
-            name="text",
-            field=models.TextField(verbose_name="описание"),
-        ),
-        migrations.AlterField(
-            model_name="shoppingcart",
-            name="recipe",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                to="recipes.recipe",
-                verbose_name="рецепт",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="shoppingcart",
-            name="user",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="shopping_cart",
-                to=settings.AUTH_USER_MODEL,
-                verbose_name="пользователь",
-            ),
-        ),
-    ]
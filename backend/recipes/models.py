@@ -2,7 +2,10 @@ from colorfield.fields import ColorField
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
-from user.models import User
+from django.db.models import (Case, F, OuterRef, Q, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Coalesce
+from user.models import Follow, User
 
 
 class Tag(models.Model):
@@ -45,6 +48,7 @@ class Ingredient(models.Model):
     name = models.CharField(
         'Название',
         max_length=settings.MODEL_NAME,
+        db_index=True,
     )
     measurement_unit = models.CharField(
         'Единица измерения',
@@ -52,6 +56,12 @@ class Ingredient(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -69,12 +79,19 @@ class Recipe(models.Model):
     name = models.CharField(
         'Название',
         max_length=settings.MODEL_NAME,
+        db_index=True,
     )
     image = models.ImageField(
         'Фото',
         upload_to='recipes/',
         blank=True,
     )
+    image_variants = models.JSONField(
+        'Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         'Описание',
     )
@@ -96,9 +113,29 @@ class Recipe(models.Model):
             )
         ]
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    favorites_count = models.IntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.IntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -130,6 +167,15 @@ class RecipeIngredient(models.Model):
     )
 
     class Meta:
+        # Порядок ингредиентов в ответе API должен быть одинаковым
+        # у сериализатора и у api.fastpath.
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                name='recipe_ingredient_idx'
+            ),
+        ]
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
 
@@ -190,4 +236,315 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return (f'{self.user.username} добавил '
-                f'{self.recipe.name} в список покупок')
\ No newline at end of file
+                f'{self.recipe.name} в список покупок')
+
+
+class ShoppingListLineManager(models.Manager):
+    """Инкрементальное обновление агрегированного списка покупок."""
+
+    def apply_delta(self, user_ids, deltas):
+        """Прибавляет deltas ({id ингредиента: количество}) к строкам
+        списка покупок каждого из пользователей user_ids."""
+        user_ids = list(user_ids)
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True
+        )
+        lines = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+        lines.update(total_amount=F('total_amount') + Case(
+            *[
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ],
+            default=Value(0)
+        ))
+        lines.filter(total_amount__lte=0).delete()
+
+    @staticmethod
+    def get_recipe_amounts(recipe_id):
+        return dict(
+            RecipeIngredient.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        )
+
+    def add_recipe(self, user_ids, recipe_id):
+        self.apply_delta(user_ids, self.get_recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.apply_delta(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in self.get_recipe_amounts(recipe_id).items()
+        })
+
+    @staticmethod
+    def get_total_amounts(recipe_ids):
+        """Суммы ингредиентов по всем рецептам recipe_ids."""
+        return dict(
+            RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list('ingredient_id').annotate(
+                total_amount=Sum('amount')
+            ).order_by()
+        )
+
+    def add_recipes(self, user_ids, recipe_ids):
+        self.apply_delta(user_ids, self.get_total_amounts(recipe_ids))
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        self.apply_delta(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in self.get_total_amounts(recipe_ids).items()
+        })
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts):
+        """Переносит правку ингредиентов рецепта в списки покупок всех
+        пользователей, у которых рецепт лежит в корзине."""
+        deltas = {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        if not any(deltas.values()):
+            return
+        self.apply_delta(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True),
+            deltas
+        )
+
+    @staticmethod
+    def get_live_totals(user_ids):
+        """Эталонные суммы, посчитанные по корзинам напрямую."""
+        return {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in RecipeIngredient.objects.filter(
+                recipe__carts__user_id__in=user_ids
+            ).values_list(
+                'recipe__carts__user_id', 'ingredient_id'
+            ).annotate(total_amount=Sum('amount')).order_by()
+        }
+
+    def rebuild(self, user_ids):
+        user_ids = list(user_ids)
+        self.filter(user_id__in=user_ids).delete()
+        self.bulk_create(
+            self.model(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount
+            )
+            for (user_id, ingredient_id), total_amount
+            in self.get_live_totals(user_ids).items()
+        )
+
+
+class ShoppingListLine(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя.
+    Поддерживается сигналами ShoppingCart и правкой рецепта, поэтому
+    скачивание списка покупок читает готовые строки."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_lines',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField('Количество')
+
+    objects = ShoppingListLineManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_line'
+            )
+        ]
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Строки списка покупок'
+
+    def __str__(self):
+        return f'{self.user.username}: {self.ingredient} {self.total_amount}'
+
+
+class TimelineEntryManager(models.Manager):
+    """Лента подписок с раздачей при записи.
+    Новый рецепт сразу попадает в ленты подписчиков автора; рецепты
+    авторов, у которых подписчиков не меньше FEED_FANOUT_LIMIT, не
+    раздаются и подмешиваются при чтении ленты. Когда подписчиков
+    становится меньше порога, рецепты, опубликованные до этого, так и
+    подмешиваются: их границу хранит User.feed_merge_before."""
+
+    @staticmethod
+    def is_fanned_out(author_id):
+        return User.objects.filter(
+            pk=author_id, followers_count__lt=settings.FEED_FANOUT_LIMIT
+        ).exists()
+
+    def fan_out(self, recipe):
+        if not self.is_fanned_out(recipe.author_id):
+            return
+        follower_ids = Follow.objects.filter(
+            author_id=recipe.author_id
+        ).values_list('user_id', flat=True).order_by().iterator(
+            chunk_size=settings.FEED_BATCH_SIZE
+        )
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe.id,
+                    author_id=recipe.author_id
+                )
+                for user_id in follower_ids
+            ),
+            batch_size=settings.FEED_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту последние рецепты нового автора подписки."""
+        if not self.is_fanned_out(author_id):
+            return
+        recipe_ids = Recipe.objects.filter(
+            author_id=author_id
+        ).order_by('-id').values_list(
+            'id', flat=True
+        )[:settings.FEED_BACKFILL_LIMIT]
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id, recipe_id=recipe_id, author_id=author_id
+                )
+                for recipe_id in recipe_ids
+            ],
+            ignore_conflicts=True
+        )
+
+    def trim(self, user_id, author_id):
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+    @staticmethod
+    def stop_merging(author_id):
+        """Автор опустился ниже порога раздачи: его новые рецепты
+        раздаются, а уже опубликованные подмешиваются по-прежнему.
+        Вызывается после уменьшения followers_count."""
+        User.objects.filter(
+            pk=author_id,
+            followers_count=settings.FEED_FANOUT_LIMIT - 1
+        ).update(feed_merge_before=Coalesce(
+            Subquery(
+                Recipe.objects.filter(author_id=OuterRef('pk')).order_by(
+                    '-id'
+                ).values('id')[:1]
+            ) + 1,
+            0
+        ))
+
+    @staticmethod
+    def get_merged_recipes(user):
+        """Рецепты авторов подписок, которые не раздавались в ленты."""
+        merged = Q()
+        for author_id, followers_count, merge_before in Follow.objects.filter(
+                Q(author__followers_count__gte=settings.FEED_FANOUT_LIMIT)
+                | Q(author__feed_merge_before__gt=0),
+                user=user
+        ).values_list(
+            'author_id', 'author__followers_count',
+            'author__feed_merge_before'
+        ):
+            if followers_count >= settings.FEED_FANOUT_LIMIT:
+                merged |= Q(author_id=author_id)
+            else:
+                merged |= Q(author_id=author_id, id__lt=merge_before)
+        if not merged:
+            return Recipe.objects.none()
+        return Recipe.objects.filter(merged)
+
+    def get_recipe_ids(self, user, before=None, limit=None):
+        """id рецептов ленты по убыванию, меньше before. Лента и рецепты
+        нераздаваемых авторов читаются отдельными запросами по индексам
+        и сливаются."""
+        entries = self.filter(user=user)
+        merged = self.get_merged_recipes(user)
+        if before is not None:
+            entries = entries.filter(recipe_id__lt=before)
+            merged = merged.filter(id__lt=before)
+        recipe_ids = set(
+            entries.order_by('-recipe_id').values_list(
+                'recipe_id', flat=True
+            )[:limit]
+        )
+        recipe_ids.update(
+            merged.order_by('-id').values_list('id', flat=True)[:limit]
+        )
+        return sorted(recipe_ids, reverse=True)[:limit]
+
+
+class TimelineEntry(models.Model):
+    """Рецепт автора в ленте подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+
+    objects = TimelineEntryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            )
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.user.username}: {self.recipe.name}'
@@ -0,0 +1,153 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+Индекс хранится в служебной таблице recipes_recipe_search, которую
+создаёт обработчик post_migrate, а не миграция: на PostgreSQL это
+tsvector с GIN-индексом и русской морфологией, на SQLite - виртуальная
+таблица FTS5. Строки индекса обновляются сигналами сохранения и удаления
+рецепта. На остальных базах поиск сводится к icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'recipes_recipe_search'
+
+
+class PostgreSQLSearch:
+    create_sql = (
+        f'CREATE TABLE {SEARCH_TABLE} ('
+        'recipe_id bigint PRIMARY KEY '
+        'REFERENCES recipes_recipe (id) ON DELETE CASCADE, '
+        'document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING GIN (document)',
+    )
+    document_sql = (
+        "setweight(to_tsvector('russian', {name}), 'A') || "
+        "setweight(to_tsvector('russian', {text}), 'B')"
+    )
+    fill_sql = (
+        f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+        'SELECT id, ' + document_sql.format(name='name', text='text')
+        + ' FROM recipes_recipe'
+    )
+    upsert_sql = (
+        f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) VALUES (%s, '
+        + document_sql.format(name='%s', text='%s') + ') '
+        'ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document'
+    )
+    delete_sql = f'DELETE FROM {SEARCH_TABLE} WHERE recipe_id = %s'
+    match_sql = (
+        f'SELECT recipe_id FROM {SEARCH_TABLE} '
+        "WHERE document @@ websearch_to_tsquery('russian', %s)"
+    )
+    rank_sql = (
+        f'SELECT ts_rank_cd(document, '
+        "websearch_to_tsquery('russian', %s)) "
+        f'FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE}.recipe_id = recipes_recipe.id'
+    )
+
+    def get_query(self, text):
+        return text
+
+
+class SQLiteSearch:
+    create_sql = (
+        f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+        "name, text, tokenize = 'unicode61 remove_diacritics 2')",
+    )
+    fill_sql = (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, name, text) '
+        'SELECT id, name, text FROM recipes_recipe'
+    )
+    upsert_sql = (
+        f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, text) '
+        'VALUES (%s, %s, %s)'
+    )
+    delete_sql = f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s'
+    match_sql = (
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    # bm25 тем меньше, чем лучше совпадение; название весит больше описания.
+    rank_sql = (
+        f'SELECT -bm25({SEARCH_TABLE}, 10.0, 1.0) FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s '
+        f'AND {SEARCH_TABLE}.rowid = recipes_recipe.id'
+    )
+
+    def get_query(self, text):
+        """Без стемминга слова ищутся по началу; пользовательский ввод
+        экранируется, чтобы не разбирался как синтаксис FTS5."""
+        return ' '.join(
+            '"{}"*'.format(word) for word in re.findall(r'\w+', text)
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgreSQLSearch(),
+    'sqlite': SQLiteSearch(),
+}
+
+
+def get_backend(using):
+    return BACKENDS.get(connections[using].vendor)
+
+
+def create_search_table(sender, using, **kwargs):
+    """Обработчик post_migrate: создаёт и заполняет индекс, если его нет."""
+    backend = get_backend(using)
+    connection = connections[using]
+    if (backend is None
+            or SEARCH_TABLE in connection.introspection.table_names()):
+        return
+    with connection.cursor() as cursor:
+        for sql in backend.create_sql:
+            cursor.execute(sql)
+        cursor.execute(backend.fill_sql)
+
+
+def rebuild_search_index(using):
+    """Перестраивает индекс целиком, например после массовой вставки."""
+    backend = get_backend(using)
+    if backend is None:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(backend.fill_sql)
+
+
+def index_recipe(recipe, using):
+    backend = get_backend(using)
+    if backend is not None:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                backend.upsert_sql, (recipe.id, recipe.name, recipe.text)
+            )
+
+
+def unindex_recipe(recipe_id, using):
+    backend = get_backend(using)
+    if backend is not None:
+        with connections[using].cursor() as cursor:
+            cursor.execute(backend.delete_sql, (recipe_id,))
+
+
+def search_recipes(queryset, text):
+    """Оставляет рецепты, подходящие под запрос, и сортирует их
+    по релевантности (search_rank), затем от новых к старым."""
+    backend = get_backend(queryset.db)
+    if backend is None:
+        return queryset.filter(
+            Q(name__icontains=text) | Q(text__icontains=text)
+        )
+    query = backend.get_query(text)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        id__in=RawSQL(backend.match_sql, (query,))
+    ).annotate(
+        search_rank=RawSQL(backend.rank_sql, (query,))
+    ).order_by('-search_rank', '-id')
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from user.models import Follow, User
+from user.signals import change_counter
+
+from .images import schedule_image_variants
+from .search import index_recipe, unindex_recipe
+from .models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                     ShoppingListLine, Tag, TimelineEntry)
+
+# Отправляется после массовой загрузки, которая обходит post_save.
+# sender - модель, в которую загружались строки.
+bulk_loaded = Signal()
+# Отправляется, когда рецепты меняются в обход post_save (update()).
+recipes_changed = Signal()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListLine.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete, а не post_delete: при каскадном удалении рецепта его
+    # ингредиенты к post_delete корзины могут быть уже удалены.
+    ShoppingListLine.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    schedule_image_variants(instance)
+
+
+def touch_recipes(**filters):
+    """Сдвигает updated_at рецептов, в ответ которых входит изменённый
+    объект, чтобы сбросить их ETag и Last-Modified."""
+    if Recipe.objects.filter(**filters).update(updated_at=timezone.now()):
+        recipes_changed.send(sender=Recipe)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(tags=instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipes_on_tags_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(id=instance.id)
+    elif action == 'pre_clear':
+        touch_recipes(tags=instance)
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(id__in=pk_set)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    # Вход пользователя сохраняет только last_login - рецепты не меняются.
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    touch_recipes(author=instance)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        field = 'favorites_count' if sender is Favorite else 'carts_count'
+        change_counter(Recipe, instance.recipe_id, field, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    field = 'favorites_count' if sender is Favorite else 'carts_count'
+    change_counter(Recipe, instance.recipe_id, field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        TimelineEntry.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        TimelineEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    TimelineEntry.objects.trim(instance.user_id, instance.author_id)
+    # Обработчики user.signals подключены раньше, поэтому followers_count
+    # здесь уже уменьшен.
+    TimelineEntry.objects.stop_merging(instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(sender, instance, using, **kwargs):
+    index_recipe(instance, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    unindex_recipe(instance.id, using)
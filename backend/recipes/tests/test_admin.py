@@ -0,0 +1,128 @@
+from api.tests.base import create_recipes
+from django.test import TestCase
+from recipes.models import (Favorite, Ingredient, RecipeIngredient,
+                            ShoppingCart, ShoppingListLine, Tag)
+from user.models import User
+
+
+class AdminTestCase(TestCase):
+    """Администратор, теги и ингредиенты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', color=f'#00000{index}',
+                slug=f'tag-{index}'
+            )
+            for index in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        """Добавляет number авторов с рецептом, отмеченным каждым из них."""
+        for index in range(number):
+            username = f'user{User.objects.count()}'
+            user = User.objects.create(
+                username=username, email=f'{username}@example.com'
+            )
+            for recipe in create_recipes(
+                    user, 1, self.tags, self.ingredients
+            ):
+                Favorite.objects.create(user=user, recipe=recipe)
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+class ChangelistQueriesTests(AdminTestCase):
+    """Число запросов списков админки не зависит от числа строк."""
+
+    def assert_num_queries(self, number, url):
+        for rows in (2, 10):
+            self.add_rows(rows)
+            with self.subTest(rows=rows), self.assertNumQueries(number):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_recipes(self):
+        # Сессия, пользователь, число строк, страница с авторами, теги
+        # для фильтра.
+        self.assert_num_queries(5, '/admin/recipes/recipe/')
+
+    def test_tags(self):
+        self.assert_num_queries(5, '/admin/recipes/tag/')
+
+    def test_ingredients(self):
+        self.assert_num_queries(4, '/admin/recipes/ingredient/')
+
+    def test_favorites(self):
+        self.assert_num_queries(4, '/admin/recipes/favorite/')
+
+    def test_shopping_carts(self):
+        self.assert_num_queries(4, '/admin/recipes/shoppingcart/')
+
+
+class RecipeIngredientInlineTests(AdminTestCase):
+    """Правка ингредиентов в админке меняет списки покупок."""
+
+    def get_form_data(self, recipe, amounts):
+        """Данные формы рецепта с ингредиентами amounts
+        ({ингредиент: количество}; None - удалить строку)."""
+        rows = {
+            row.ingredient: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        data = {
+            'author': recipe.author_id,
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'tags': [tag.id for tag in self.tags],
+            'recipeingredients-TOTAL_FORMS': len(amounts),
+            'recipeingredients-INITIAL_FORMS': len(rows),
+            'recipeingredients-MIN_NUM_FORMS': 1,
+            'recipeingredients-MAX_NUM_FORMS': 1000,
+        }
+        # Существующие строки идут первыми, как в формсете.
+        ordered = sorted(amounts, key=lambda item: item not in rows)
+        for index, ingredient in enumerate(ordered):
+            prefix = f'recipeingredients-{index}-'
+            row = rows.get(ingredient)
+            data[prefix + 'recipe'] = recipe.id
+            data[prefix + 'ingredient'] = ingredient.id
+            data[prefix + 'amount'] = amounts[ingredient] or 1
+            if row is not None:
+                data[prefix + 'id'] = row.id
+            if amounts[ingredient] is None:
+                data[prefix + 'DELETE'] = 'on'
+        return data
+
+    def test_change_ingredients(self):
+        self.add_rows(1)
+        user = User.objects.get(username='user1')
+        recipe = user.recipes.get()
+        first, second, third = self.ingredients
+        extra = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        response = self.client.post(
+            f'/admin/recipes/recipe/{recipe.id}/change/',
+            self.get_form_data(
+                recipe, {first: 5, second: None, third: 1, extra: 2}
+            )
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            dict(ShoppingListLine.objects.filter(user=user).values_list(
+                'ingredient_id', 'total_amount'
+            )),
+            {first.id: 5, third.id: 1, extra.id: 2}
+        )
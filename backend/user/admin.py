@@ -5,16 +5,20 @@ from .models import Follow, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    """Админка пользователя."""
+    """Админка пользователя.
+    Поиск только по началу username и email: для уникальных полей
+    на PostgreSQL есть индексы, пригодные для LIKE 'x%'."""
     list_display = (
         'id',
         'username',
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
-    search_fields = ('username', 'email')
-    list_filter = ('username', 'email')
+    search_fields = ('username__startswith', 'email__startswith')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -26,6 +30,11 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
-    empty_value_display = '-пусто-'
\ No newline at end of file
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username__startswith',
+        'author__username__startswith',
+    )
+    raw_id_fields = ('user', 'author')
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
@@ -1,6 +1,9 @@
 from django.apps import AppConfig
 
 
-class UsersConfig(AppConfig):
+class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "users"
+    name = "user"
+
+    def ready(self):
+        from . import signals  # noqa: F401
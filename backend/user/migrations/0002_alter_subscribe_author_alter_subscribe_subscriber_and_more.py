@@ -1,70 +0,0 @@
-# Generated by Django 4.1.7 on 2023-03-29 14:39
-
-from django.conf import settings
-import django.core.validators
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ("users", "0001_initial"),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name="subscribe",
-            name="author",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="authors",
-                to=settings.AUTH_USER_MODEL,
-                verbose_name="автор",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="subscribe",
-            name="subscriber",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE,
-                related_name="subscribers",
-                to=settings.AUTH_USER_MODEL,
-                verbose_name="подписчик",
-            ),
-        ),
-        migrations.AlterField(
-            model_name="user",
-            name="email",
-            field=models.EmailField(
-                max_length=254, unique=True, verbose_name="электронная почта"
-            ),
-        ),
-        migrations.AlterField(
-            model_name="user",
-            name="first_name",
-            field=models.CharField(max_length=150, verbose_name="имя"),
-        ),
-        migrations.AlterField(
-            model_name="user",
-            name="last_name",
-            field=models.CharField(max_length=150, verbose_name="фамилия"),
-        ),
-        migrations.AlterField(
-            model_name="user",
-            name="password",
-            field=models.CharField(max_length=150, verbose_name="пароль"),
-        ),
-        migrations.AlterField(
-            model_name="user",
-            name="username",
-            field=models.CharField(
-                max_length=150,
-                unique=True,
-                validators=[
-                    django.core.validators.RegexValidator(regex="^[\\w.@+-]+$")
-                ],
-                verbose_name="имя пользователя",
-            ),
-        ),
-    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_merge_before',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Подмешивать в ленту рецепты до id'),
+        ),
+    ]
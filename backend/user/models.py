@@ -40,6 +40,23 @@ class User(AbstractUser):
         null=False,
         max_length=150,
     )
+    recipes_count = models.IntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.IntegerField(
+        'Число подписчиков',
+        default=0,
+        editable=False,
+    )
+    # Рецепты автора с id меньше этого опубликованы, когда у него было
+    # не меньше FEED_FANOUT_LIMIT подписчиков, и могли не попасть в ленты.
+    feed_merge_before = models.IntegerField(
+        'Подмешивать в ленту рецепты до id',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('id',)
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from user.models import Follow, User
+
+
+class ChangelistQueriesTests(TestCase):
+    """Число запросов списков админки не зависит от числа строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        """Добавляет number пользователей, подписанных на администратора."""
+        for index in range(number):
+            username = f'user{User.objects.count()}'
+            user = User.objects.create(
+                username=username, email=f'{username}@example.com'
+            )
+            Follow.objects.create(user=user, author=self.admin)
+
+    def assert_num_queries(self, number, url):
+        for rows in (2, 10):
+            self.add_rows(rows)
+            with self.subTest(rows=rows), self.assertNumQueries(number):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_users(self):
+        # Сессия, пользователь, число строк, страница.
+        self.assert_num_queries(4, '/admin/user/user/')
+
+    def test_follows(self):
+        self.assert_num_queries(4, '/admin/user/follow/')